@@ -1,78 +1,137 @@
-from datetime import datetime, timedelta
-from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+import time
+from datetime import timedelta
+from typing import Optional, Union
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 import models
-import schemas
+from cache import TTLCache
+from config import ACCESS_TOKEN_EXPIRE_MINUTES, REFRESH_TOKEN_EXPIRE_DAYS, USER_CACHE_TTL_SECONDS, USER_CACHE_MAX_SIZE
 from database import get_db
+from hashing import get_pwd_context, verify_password_async
+from metrics import record_stage
+from tokens import TokenUser, encode_refresh_token, encode_token, verify_token
 
-# Security configuration
-SECRET_KEY = "your-secret-key-change-this-in-production"
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
-
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
+
+# Cache user (detached) berdasarkan username / token subject
+user_cache = TTLCache(maxsize=USER_CACHE_MAX_SIZE, ttl=USER_CACHE_TTL_SECONDS, name="user_cache")
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify password"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     """Hash password"""
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    """Create JWT access token"""
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
-
-def get_user_by_username(db: Session, username: str):
+    """Create JWT access token signed with the active key of the keyring"""
+    return encode_token(data, expires_delta or timedelta(minutes=15))
+
+def token_claims(user: models.User) -> dict:
+    """Claims that let routes authorize without loading the user row"""
+    return {"sub": user.username, "uid": user.id, "name": user.name}
+
+def create_refresh_token(user: models.User) -> str:
+    """Long-lived token for /api/auth/refresh (revocable by jti)"""
+    return encode_refresh_token(token_claims(user), timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
+
+async def get_user_by_username(db: AsyncSession, username: str):
     """Get user by username"""
-    return db.query(models.User).filter(models.User.username == username).first()
+    result = await db.execute(select(models.User).where(models.User.username == username))
+    return result.scalars().first()
 
-def get_user_by_email(db: Session, email: str):
+async def get_cached_user(db: AsyncSession, username: str):
+    """Get user by username, served from user_cache when possible"""
+    cached = user_cache.get(username)
+    if cached is None:
+        user = await get_user_by_username(db, username=username)
+        if user is None:
+            return None
+        # Simpan salinan detached, sesi request tetap memakai instance sendiri
+        db.expunge(user)
+        user_cache.set(username, user)
+        cached = user
+    # Attach ke sesi ini tanpa SELECT
+    return await db.merge(cached, load=False)
+
+def invalidate_cached_user(username: str):
+    """Drop user from user_cache after it has been modified"""
+    user_cache.invalidate(username)
+
+async def get_user_by_email(db: AsyncSession, email: str):
     """Get user by email"""
-    return db.query(models.User).filter(models.User.email == email).first()
+    result = await db.execute(select(models.User).where(models.User.email == email))
+    return result.scalars().first()
 
-def authenticate_user(db: Session, email: str, password: str):
+async def authenticate_user(db: AsyncSession, email: str, password: str):
     """Authenticate user with email"""
-    user = get_user_by_email(db, email)
+    user = await get_user_by_email(db, email)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    # Hashing CPU-bound, jalankan di hash pool
+    if not await verify_password_async(password, user.hashed_password):
         return False
     return user
 
+def decode_username(token: str) -> Optional[str]:
+    """Return the token subject, or None if the token is invalid"""
+    user = verify_token(token)
+    return user.username if user is not None else None
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get current authenticated user"""
-    credentials_exception = HTTPException(
+    start = time.perf_counter()
+    try:
+        return await _get_current_user(token, db)
+    finally:
+        record_stage("auth", time.perf_counter() - start)
+
+async def get_token_user(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db)
+) -> Union[TokenUser, models.User]:
+    """
+    Identity from the token claims alone (no user row); for routes that only
+    need `current_user.id`. Tokens without a `uid` claim fall back to the row.
+    """
+    start = time.perf_counter()
+    try:
+        user = verify_token(token)
+        if user is None:
+            raise credentials_exception()
+        if user.id is None:
+            return await _get_current_user(token, db)
+        return user
+    finally:
+        record_stage("auth", time.perf_counter() - start)
+
+async def get_stream_user(
+    token: Optional[str] = Depends(oauth2_scheme_optional),
+    access_token: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """Like get_token_user, but also accepts ?access_token= (EventSource cannot send headers)"""
+    return await get_token_user(token or access_token or "", db)
+
+def credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        token_data = schemas.TokenData(username=username)
-    except JWTError:
-        raise credentials_exception
-    
-    user = get_user_by_username(db, username=token_data.username)
+
+async def _get_current_user(token: str, db: AsyncSession):
+    token_user = verify_token(token)
+    if token_user is None:
+        raise credentials_exception()
+    user = await get_cached_user(db, username=token_user.username)
     if user is None:
-        raise credentials_exception
+        raise credentials_exception()
     return user
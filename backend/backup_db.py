@@ -1,36 +1,202 @@
 """
-Script untuk backup database
+Backup online database SQLite memakai sqlite3 backup API.
+Aman dipakai saat server berjalan (WAL): disalin per beberapa page dengan jeda
+agar penulis tidak tertahan, dicek dengan PRAGMA integrity_check, dikompres
+gzip, lalu backup lama dirotasi. Satu backup per folder pada satu waktu: lock
+(file SQLite di folder backup, BEGIN IMMEDIATE) dipakai bersama semua proses,
+jadi jadwal di setiap worker uvicorn tidak membuat backup ganda.
+
+Jalankan: python backup_db.py [--keep 7] [--no-compress]
 """
+import argparse
+import asyncio
+import gzip
+import logging
+import os
+import re
 import shutil
+import sqlite3
+import time
+from contextlib import contextmanager
 from datetime import datetime
-import os
+from typing import List, Optional
+from sqlalchemy.engine import make_url
+from config import (
+    BACKUP_COMPRESS,
+    BACKUP_DIR,
+    BACKUP_KEEP,
+    BACKUP_PAGES_PER_STEP,
+    BACKUP_STEP_SLEEP_MS,
+)
+from database import SQLALCHEMY_DATABASE_URL
+
+logger = logging.getLogger("todo.backup")
+
+# Hasil backup terakhir (untuk /health/backup)
+last_backup = {}
+
+# File lock di folder backup (database SQLite kosong, dikunci dengan BEGIN IMMEDIATE)
+LOCK_FILE = ".backup.lock"
+
+
+def sqlite_path(url: str = SQLALCHEMY_DATABASE_URL):
+    """Database file of a SQLite URL, or None for other databases"""
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite" or not parsed.database or parsed.database == ":memory:":
+        return None
+    return parsed.database
+
 
-def backup_database():
-    source = "todo_app.db"
-    
+def completed_backups(backup_dir: str, prefix: str) -> List[str]:
+    """Finished backups starting with prefix, oldest first (no .partial files)"""
+    pattern = re.compile(re.escape(prefix) + r"\d{8}_\d{6}\.db(\.gz)?$")
+    return sorted(name for name in os.listdir(backup_dir) if pattern.match(name))
+
+
+def rotate_backups(backup_dir: str, prefix: str, keep: int):
+    """Delete all but the newest `keep` backups starting with prefix"""
+    backups = completed_backups(backup_dir, prefix)
+    removed = backups[:-keep] if keep > 0 else []
+    for name in removed:
+        os.remove(os.path.join(backup_dir, name))
+    return removed
+
+
+@contextmanager
+def backup_lock(backup_dir: str):
+    """
+    Exclusive lock shared by all processes backing up into backup_dir; yields False
+    when another backup holds it. SQLite releases it if the process dies.
+    """
+    conn = sqlite3.connect(os.path.join(backup_dir, LOCK_FILE), timeout=0, isolation_level=None)
+    try:
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError:
+            yield False
+            return
+        yield True
+        conn.execute("ROLLBACK")
+    finally:
+        conn.close()
+
+
+def backup_database(
+    source: str = None,
+    backup_dir: str = BACKUP_DIR,
+    keep: int = BACKUP_KEEP,
+    compress: bool = BACKUP_COMPRESS,
+    pages_per_step: int = BACKUP_PAGES_PER_STEP,
+    step_sleep: float = BACKUP_STEP_SLEEP_MS / 1000,
+    min_interval: float = 0.0,
+) -> Optional[dict]:
+    """
+    Hot-copy the database, verify it, optionally gzip it and rotate old backups.
+    Returns None (skipped) when another process is backing up into backup_dir, or
+    when the newest finished backup is younger than `min_interval` seconds.
+    """
+    source = source or sqlite_path()
+    if source is None:
+        raise RuntimeError("Backup hanya didukung untuk database SQLite")
     if not os.path.exists(source):
-        print("❌ Database tidak ditemukan!")
-        return
-    
-    # Create backups folder if not exists
-    if not os.path.exists("backups"):
-        os.makedirs("backups")
-    
-    # Create backup with timestamp
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    destination = f"backups/todo_app_backup_{timestamp}.db"
-    
+        raise FileNotFoundError(f"Database tidak ditemukan: {source}")
+
+    os.makedirs(backup_dir, exist_ok=True)
+    prefix = os.path.splitext(os.path.basename(source))[0] + "_backup_"
+    with backup_lock(backup_dir) as locked:
+        if not locked:
+            logger.info("Backup lain sedang berjalan di %s, dilewati", backup_dir)
+            return None
+        newest = completed_backups(backup_dir, prefix)[-1:]
+        if newest and time.time() - os.path.getmtime(os.path.join(backup_dir, newest[0])) < min_interval:
+            logger.info("Backup %s masih baru, dilewati", newest[0])
+            return None
+        return _backup(source, backup_dir, prefix, keep, compress, pages_per_step, step_sleep)
+
+
+def _backup(source: str, backup_dir: str, prefix: str, keep: int, compress: bool,
+            pages_per_step: int, step_sleep: float) -> dict:
+    start = time.perf_counter()
+    name = prefix + datetime.now().strftime("%Y%m%d_%H%M%S")
+    destination = os.path.join(backup_dir, name + ".db")
+    partial = destination + ".partial"
+
+    def throttle(status, remaining, total):
+        time.sleep(step_sleep)
+
+    src = sqlite3.connect(source, isolation_level=None)
+    dst = sqlite3.connect(partial)
     try:
-        shutil.copy2(source, destination)
-        print(f"✅ Database berhasil di-backup ke: {destination}")
-        
-        # Show backup size
-        size = os.path.getsize(destination)
-        print(f"📦 Ukuran: {size:,} bytes")
-        
-    except Exception as e:
-        print(f"❌ Error saat backup: {e}")
+        # Read transaction: dengan WAL backup memakai snapshot ini sehingga tidak
+        # restart setiap kali ada tulisan baru, dan penulis tetap jalan
+        src.execute("BEGIN")
+        src.execute("SELECT 1 FROM sqlite_master LIMIT 1")
+        src.backup(dst, pages=pages_per_step, progress=throttle)
+        src.execute("COMMIT")
+
+        result = dst.execute("PRAGMA integrity_check").fetchone()[0]
+        if result != "ok":
+            raise RuntimeError(f"Integrity check gagal: {result}")
+    except Exception:
+        dst.close()
+        os.remove(partial)
+        raise
+    finally:
+        src.close()
+    dst.close()
+
+    if compress:
+        destination += ".gz"
+        with open(partial, "rb") as raw, gzip.open(destination + ".partial", "wb", compresslevel=6) as packed:
+            shutil.copyfileobj(raw, packed, 1024 * 1024)
+        os.remove(partial)
+        partial = destination + ".partial"
+    os.replace(partial, destination)
+
+    return {
+        "path": destination,
+        "size": os.path.getsize(destination),
+        "seconds": round(time.perf_counter() - start, 3),
+        "removed": rotate_backups(backup_dir, prefix, keep),
+        "finished_at": datetime.utcnow().isoformat(),
+    }
+
+
+async def run_backup_schedule(interval_seconds: float):
+    """Background task: back up every interval without blocking the event loop"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            # Setiap worker punya jadwal sendiri: lewati bila worker lain sudah backup
+            # dalam interval ini (0.9: toleransi selisih waktu antar jadwal)
+            info = await asyncio.to_thread(backup_database, min_interval=interval_seconds * 0.9)
+            if info is None:
+                continue
+            last_backup.clear()
+            last_backup.update(info, ok=True)
+            logger.info("Backup selesai: %s (%d bytes, %.1f s)", info["path"], info["size"], info["seconds"])
+        except Exception as e:
+            last_backup.update(ok=False, error=str(e), failed_at=datetime.utcnow().isoformat())
+            logger.exception("Backup gagal")
+
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backup online database SQLite")
+    parser.add_argument("--keep", type=int, default=BACKUP_KEEP, help="jumlah backup yang disimpan")
+    parser.add_argument("--no-compress", action="store_true", help="simpan sebagai .db tanpa gzip")
+    parser.add_argument("--dir", default=BACKUP_DIR, help="folder backup")
+    args = parser.parse_args()
+
     print("🔄 Membackup database...\n")
-    backup_database()
+    try:
+        info = backup_database(backup_dir=args.dir, keep=args.keep, compress=not args.no_compress)
+    except Exception as e:
+        print(f"❌ Error saat backup: {e}")
+        raise SystemExit(1)
+    if info is None:
+        print(f"❌ Backup lain sedang berjalan di {args.dir}, coba lagi nanti")
+        raise SystemExit(1)
+    print(f"✅ Database berhasil di-backup ke: {info['path']}")
+    print(f"📦 Ukuran: {info['size']:,} bytes ({info['seconds']} detik)")
+    for name in info["removed"]:
+        print(f"🗑️  Backup lama dihapus: {name}")
@@ -0,0 +1,354 @@
+"""
+Benchmark API (in-process lewat ASGI) dan micro-benchmark
+Jalankan: python benchmark.py --users 5 --todos 2000 --notes 500 --output bench.json
+Bandingkan: python benchmark.py --compare bench.json
+
+Secara default memakai database sementara, bukan todo_app.db.
+Butuh httpx (pip install httpx).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+PASSWORD = "bench123"
+HASHING_ROUTES = {"POST /api/auth/login", "POST /api/auth/register", "PUT /api/auth/change-password"}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark Todo List API")
+    parser.add_argument("--users", type=int, default=3, help="jumlah user yang di-seed")
+    parser.add_argument("--todos", type=int, default=1000, help="todos per user")
+    parser.add_argument("--notes", type=int, default=200, help="notes per user")
+    parser.add_argument("--requests", type=int, default=200, help="request per route")
+    parser.add_argument("--concurrency", type=int, default=10, help="request paralel")
+    parser.add_argument("--micro-iterations", type=int, default=2000, help="iterasi per micro-benchmark")
+    parser.add_argument("--fast-serialization", action="store_true", help="aktifkan FAST_SERIALIZATION (kolom + orjson)")
+    parser.add_argument("--database-url", help="pakai database ini (default: file sementara)")
+    parser.add_argument("--output", help="simpan hasil ke file JSON")
+    parser.add_argument("--compare", help="bandingkan dengan hasil JSON sebelumnya")
+    parser.add_argument("--threshold", type=float, default=20.0, help="batas regresi p95 dalam persen")
+    return parser.parse_args()
+
+
+def summarize(latencies, statuses, elapsed):
+    """Latency percentiles (ms) and throughput of successful requests, status code counts"""
+    latencies = sorted(latencies)
+    if len(latencies) >= 2:
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = latencies[0] if latencies else 0.0
+    return {
+        "count": len(latencies),
+        "errors": sum(n for code, n in statuses.items() if not 200 <= code < 300),
+        "statuses": {str(code): n for code, n in sorted(statuses.items())},
+        "rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+        "p50_ms": round(p50 * 1000, 3),
+        "p95_ms": round(p95 * 1000, 3),
+        "p99_ms": round(p99 * 1000, 3),
+    }
+
+
+async def run_route(client, make_request, count, concurrency):
+    """
+    Fire `count` requests with bounded concurrency, return summary. Only 2xx
+    responses are timed; others are counted in `errors` / `statuses`.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, statuses = [], {}
+
+    async def one(i):
+        method, url, kwargs = make_request(i)
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            elapsed = time.perf_counter() - start
+        if 200 <= response.status_code < 300:
+            latencies.append(elapsed)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    # Warm-up, pakai index di luar range agar tidak bentrok (register, delete)
+    for i in range(min(3, count)):
+        method, url, kwargs = make_request(count + i)
+        await client.request(method, url, **kwargs)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(count)))
+    return summarize(latencies, statuses, time.perf_counter() - start)
+
+
+def build_scenarios(ctx, n):
+    """(name, request factory, count) for every route in routers/"""
+    read_h, write_h = ctx["read_headers"], ctx["write_headers"]
+    refresh_body = {"refresh_token": ctx["read_refresh_token"]}
+    read_todos, read_notes = ctx["read_todo_ids"], ctx["read_note_ids"]
+    write_todos, write_notes = ctx["write_todo_ids"], ctx["write_note_ids"]
+    slow = max(1, min(n, 50))  # route yang memakai password hashing (HASHING_ROUTES)
+    import_body = "".join(
+        json.dumps({"text": f"Import {j}", "priority": "low", "category": "Kerja"}) + "\n" for j in range(1000)
+    )
+
+    return [
+        ("POST /api/auth/login", lambda i: ("POST", "/api/auth/login", {"json": {"email": ctx["read_email"], "password": PASSWORD}}), slow),
+        ("POST /api/auth/register", lambda i: ("POST", "/api/auth/register", {"json": {"username": f"reg{i}", "email": f"reg{i}@example.com", "name": "Reg", "password": PASSWORD}}), slow),
+        ("POST /api/auth/refresh", lambda i: ("POST", "/api/auth/refresh", {"json": refresh_body}), n),
+        ("GET /api/auth/me", lambda i: ("GET", "/api/auth/me", {"headers": read_h}), n),
+        ("PUT /api/auth/profile", lambda i: ("PUT", "/api/auth/profile", {"headers": write_h, "json": {"name": f"Bench {i}"}}), n),
+        ("PUT /api/auth/change-password", lambda i: ("PUT", "/api/auth/change-password", {"headers": write_h, "json": {"old_password": PASSWORD, "new_password": PASSWORD}}), slow),
+        ("GET /api/todos", lambda i: ("GET", "/api/todos/", {"headers": read_h, "params": {"limit": 100}}), n),
+        ("GET /api/todos?sort=priority", lambda i: ("GET", "/api/todos/", {"headers": read_h, "params": {"limit": 100, "sort": "priority", "completed": "false"}}), n),
+        ("GET /api/todos/page", lambda i: ("GET", "/api/todos/page", {"headers": read_h, "params": {"limit": 100}}), n),
+        ("GET /api/todos/stats", lambda i: ("GET", "/api/todos/stats", {"headers": read_h}), n),
+        ("GET /api/todos/{id}", lambda i: ("GET", f"/api/todos/{read_todos[i % len(read_todos)]}", {"headers": read_h}), n),
+        ("POST /api/todos", lambda i: ("POST", "/api/todos/", {"headers": write_h, "json": {"text": f"Bench {i}", "priority": "high"}}), n),
+        ("PUT /api/todos/{id}", lambda i: ("PUT", f"/api/todos/{write_todos[i % len(write_todos)]}", {"headers": write_h, "json": {"completed": bool(i % 2)}}), n),
+        ("POST /api/todos/batch", lambda i: ("POST", "/api/todos/batch", {"headers": write_h, "json": {"operations": [{"op": "toggle", "id": t} for t in write_todos[:50]]}}), n),
+        ("DELETE /api/todos/{id}", lambda i: ("DELETE", f"/api/todos/{write_todos[-(i + 1)]}", {"headers": write_h}), min(n, len(write_todos) // 2)),
+        ("DELETE /api/todos/completed/clear", lambda i: ("DELETE", "/api/todos/completed/clear", {"headers": write_h}), n),
+        ("GET /api/notes", lambda i: ("GET", "/api/notes/", {"headers": read_h}), n),
+        ("GET /api/notes/page", lambda i: ("GET", "/api/notes/page", {"headers": read_h, "params": {"limit": 50}}), n),
+        ("GET /api/notes/{id}", lambda i: ("GET", f"/api/notes/{read_notes[i % len(read_notes)]}", {"headers": read_h}), n),
+        ("POST /api/notes", lambda i: ("POST", "/api/notes/", {"headers": write_h, "json": {"title": f"Bench {i}", "content": "isi " * 50}}), n),
+        ("PUT /api/notes/{id}", lambda i: ("PUT", f"/api/notes/{write_notes[i % len(write_notes)]}", {"headers": write_h, "json": {"title": f"Ubah {i}"}}), n),
+        ("DELETE /api/notes/{id}", lambda i: ("DELETE", f"/api/notes/{write_notes[-(i + 1)]}", {"headers": write_h}), min(n, len(write_notes) // 2)),
+        ("GET /api/search", lambda i: ("GET", "/api/search/", {"headers": read_h, "params": {"q": "catatan"}}), n),
+        ("GET /api/sync", lambda i: ("GET", "/api/sync/", {"headers": read_h, "params": {"since": 1}}), n),
+        ("GET /api/sync?since=0", lambda i: ("GET", "/api/sync/", {"headers": read_h, "params": {"since": 0}}), max(1, n // 10)),
+        ("GET /api/export", lambda i: ("GET", "/api/export/", {"headers": {**read_h, "Accept-Encoding": "gzip"}}), max(1, n // 10)),
+        ("POST /api/import", lambda i: ("POST", "/api/import/", {"headers": write_h, "content": import_body}), max(1, n // 10)),
+        ("GET /health", lambda i: ("GET", "/health", {}), n),
+    ]
+
+
+def micro(fn, iterations):
+    """Time `fn` per call, pytest-benchmark style summary (microseconds)"""
+    for _ in range(min(50, iterations)):
+        fn()
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    mean = statistics.fmean(timings)
+    return {
+        "iterations": iterations,
+        "min_us": round(min(timings) * 1e6, 3),
+        "mean_us": round(mean * 1e6, 3),
+        "stddev_us": round(statistics.pstdev(timings) * 1e6, 3),
+        "median_us": round(statistics.median(timings) * 1e6, 3),
+        "ops_per_sec": round(1 / mean, 1) if mean else 0.0,
+    }
+
+
+def run_micro_benchmarks(iterations, user_id):
+    from typing import List
+    from jose import jwt
+    from pydantic import TypeAdapter
+    from sqlalchemy import func, select
+    import auth
+    import models
+    import schemas
+    import tokens
+    from database import SessionLocal
+    from serialization import dumps, rows_as_dicts, schema_columns
+
+    token = auth.create_access_token({"sub": "bench0", "uid": user_id}, timedelta(minutes=30))
+    db = SessionLocal()
+    try:
+        rows = db.execute(
+            select(models.Todo).where(models.Todo.user_id == user_id).limit(1000)
+        ).scalars().all()
+        list_size = db.execute(
+            select(func.count()).select_from(models.Todo).where(models.Todo.user_id == user_id)
+        ).scalar_one()
+    finally:
+        db.close()
+    adapter = TypeAdapter(List[schemas.Todo])
+
+    def serialize_todos():
+        adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+
+    # Seluruh list todo user (query + serialisasi): jalur ORM + pydantic vs kolom + orjson
+
+    def list_orm_pydantic():
+        with SessionLocal() as session:
+            todos = session.execute(select(models.Todo).where(models.Todo.user_id == user_id)).scalars().all()
+            adapter.dump_json(adapter.validate_python(todos, from_attributes=True))
+
+    def list_projection_orjson():
+        with SessionLocal() as session:
+            result = session.execute(
+                select(*schema_columns(schemas.Todo, models.Todo)).where(models.Todo.user_id == user_id)
+            )
+            dumps(rows_as_dicts(result))
+
+    list_iterations = max(1, iterations // 200)
+    return {
+        "create_access_token": micro(lambda: auth.create_access_token({"sub": "bench0"}, timedelta(minutes=30)), iterations),
+        "jwt_decode": micro(lambda: jwt.decode(token, tokens.KEYS[tokens.ACTIVE_KID], algorithms=[tokens.ALGORITHM]), iterations),
+        "verify_token_cached": micro(lambda: tokens.verify_token(token), iterations),
+        f"serialize_todos_{len(rows)}": micro(serialize_todos, max(1, iterations // 100)),
+        f"list_todos_orm_pydantic_{list_size}": micro(list_orm_pydantic, list_iterations),
+        f"list_todos_columns_orjson_{list_size}": micro(list_projection_orjson, list_iterations),
+    }
+
+
+async def run_api_benchmarks(args, ctx):
+    import httpx
+    import main
+
+    # ASGITransport tidak menjalankan lifespan: jalankan sendiri lalu tunggu warm-up
+    # (revocation list dimuat, pool terisi) seperti /health/ready di server
+    transport = httpx.ASGITransport(app=main.app)
+    results = {}
+    async with main.app.router.lifespan_context(main.app), \
+            httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        while not main.readiness.ready:
+            if main.readiness.error:
+                raise RuntimeError(f"Warm-up gagal: {main.readiness.error}")
+            await asyncio.sleep(0.05)
+        for key in ("read", "write"):
+            response = await client.post("/api/auth/login", json={"email": ctx[f"{key}_email"], "password": PASSWORD})
+            response.raise_for_status()
+            ctx[f"{key}_headers"] = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            ctx[f"{key}_refresh_token"] = response.json()["refresh_token"]
+
+        for name, make_request, count in build_scenarios(ctx, args.requests):
+            if count <= 0:
+                continue
+            concurrency = args.concurrency
+            if name in HASHING_ROUTES:
+                # Lebih dari max_pending hash paralel dijawab 503 oleh hash pool
+                concurrency = min(concurrency, max(1, main.hash_pool.max_pending))
+            results[name] = {**await run_route(client, make_request, count, concurrency), "concurrency": concurrency}
+            r = results[name]
+            print(f"  {name:<36} {r['rps']:>9.1f} req/s  p50 {r['p50_ms']:>8.2f} ms  "
+                  f"p95 {r['p95_ms']:>8.2f} ms  p99 {r['p99_ms']:>8.2f} ms  err {r['errors']}")
+    return results
+
+
+def route_errors(routes):
+    """Print routes with non-2xx responses, return False if there are any"""
+    failed = {name: r for name, r in routes.items() if r["errors"]}
+    if failed:
+        print("\n❌ Route dengan response error (tidak ikut dihitung di latency):")
+        for name, r in failed.items():
+            print(f"  {name:<36} {r['errors']} error  {r['statuses']}")
+    return not failed
+
+
+def compare(current, baseline_path, threshold):
+    """Print p95 changes against a previous run, return False on regression or new errors"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    ok = True
+    print(f"\n📊 Dibandingkan dengan {baseline_path} (batas {threshold:.0f}%):")
+    for section, key in (("routes", "p95_ms"), ("micro", "mean_us")):
+        for name, result in current.get(section, {}).items():
+            previous = baseline.get(section, {}).get(name, {})
+            before = previous.get(key)
+            if not before:
+                continue
+            change = (result[key] - before) / before * 100
+            more_errors = result.get("errors", 0) > previous.get("errors", 0)
+            regressed = change > threshold or more_errors
+            ok = ok and not regressed
+            mark = "❌" if regressed else "✅"
+            errors = f"  error {previous.get('errors', 0)} -> {result['errors']}" if more_errors else ""
+            print(f"  {mark} {name:<36} {key} {before:>10.2f} -> {result[key]:>10.2f} ({change:+.1f}%){errors}")
+    return ok
+
+
+def main_cli():
+    args = parse_args()
+    tmpdir = None
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        tmpdir = tempfile.mkdtemp(prefix="todo-bench-")
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    if args.fast_serialization:
+        os.environ["FAST_SERIALIZATION"] = "true"
+    # Route login/register dijalankan ratusan kali dari satu IP
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+    from sqlalchemy import select
+    import models
+    from database import SessionLocal, engine
+    from migrations import upgrade
+    from seed_data import seed_bulk
+
+    upgrade(engine)
+
+    print(f"🌱 Seeding {args.users} user x {args.todos} todos / {args.notes} notes...")
+    start = time.perf_counter()
+    user_ids = seed_bulk(max(args.users, 2), args.todos, args.notes, password=PASSWORD)
+    print(f"   selesai dalam {time.perf_counter() - start:.2f} s")
+
+    db = SessionLocal()
+    try:
+        def ids(model, user_id):
+            return db.execute(select(model.id).where(model.user_id == user_id).order_by(model.id)).scalars().all()
+        ctx = {
+            "read_email": "bench0@example.com",
+            "write_email": "bench1@example.com",
+            "read_todo_ids": ids(models.Todo, user_ids[0]) or [0],
+            "read_note_ids": ids(models.Note, user_ids[0]) or [0],
+            "write_todo_ids": ids(models.Todo, user_ids[1]) or [0],
+            "write_note_ids": ids(models.Note, user_ids[1]) or [0],
+        }
+    finally:
+        db.close()
+
+    print(f"\n🚀 API ({args.requests} request/route, concurrency {args.concurrency}):")
+    routes = asyncio.run(run_api_benchmarks(args, ctx))
+
+    print("\n⏱️  Micro-benchmarks:")
+    micro_results = run_micro_benchmarks(args.micro_iterations, user_ids[0])
+    for name, r in micro_results.items():
+        print(f"  {name:<36} mean {r['mean_us']:>10.2f} us  min {r['min_us']:>10.2f} us  {r['ops_per_sec']:>10.1f} ops/s")
+
+    results = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "users": args.users,
+            "todos_per_user": args.todos,
+            "notes_per_user": args.notes,
+            "requests_per_route": args.requests,
+            "concurrency": args.concurrency,
+            "fast_serialization": args.fast_serialization,
+        },
+        "routes": routes,
+        "micro": micro_results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Hasil disimpan ke {args.output}")
+
+    ok = route_errors(routes)
+    if args.compare:
+        ok = compare(results, args.compare, args.threshold) and ok
+
+    if tmpdir:
+        from database import engine, async_engine
+        engine.dispose()
+        asyncio.run(async_engine.dispose())
+        import shutil
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main_cli() else 1)
@@ -0,0 +1,121 @@
+"""
+Script untuk mengecek migrasi dari database lama (skema sebelum migrations.py)
+Membuat database dengan skema awal + data bertanggal lama, menjalankan upgrade()
+dan semua backfill, lalu memastikan data tidak berubah: updated_at note tetap
+(backfill tidak boleh ikut memicu onupdate), isi note terbaca utuh, preview dan
+priority_rank terisi, dan upgrade kedua tidak menerapkan apa-apa.
+Gagal (exit code 1) jika ada yang tidak sesuai.
+Jalankan: python check_migrations.py [--notes 50]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import Session, undefer
+import models
+from database import apply_sqlite_pragmas
+from migrations import MIGRATIONS, pending_backfills, pending_migrations, run_backfill, upgrade
+
+# Skema awal (create_all sebelum ada migrasi)
+BASELINE_SCHEMA = """
+CREATE TABLE users (
+    id INTEGER PRIMARY KEY, username VARCHAR NOT NULL, email VARCHAR NOT NULL,
+    name VARCHAR NOT NULL, hashed_password VARCHAR NOT NULL, created_at DATETIME
+);
+CREATE TABLE todos (
+    id INTEGER PRIMARY KEY, text VARCHAR NOT NULL, completed BOOLEAN, created_at DATETIME,
+    due_date DATETIME, user_id INTEGER NOT NULL REFERENCES users (id),
+    category VARCHAR, priority VARCHAR, description VARCHAR
+);
+CREATE TABLE notes (
+    id INTEGER PRIMARY KEY, title VARCHAR(200) NOT NULL, content TEXT, category VARCHAR(50),
+    color VARCHAR(20), user_id INTEGER NOT NULL REFERENCES users (id),
+    created_at DATETIME, updated_at DATETIME
+);
+"""
+
+OLD_DATE = datetime(2020, 1, 1, 8, 0)
+
+
+def seed_baseline(engine, count: int) -> dict:
+    """Old-schema rows; returns {note_id: (content, updated_at)}"""
+    expected = {}
+    with engine.begin() as conn:
+        for statement in BASELINE_SCHEMA.split(";"):
+            if statement.strip():
+                conn.exec_driver_sql(statement)
+        conn.execute(text(
+            "INSERT INTO users (id, username, email, name, hashed_password, created_at) "
+            "VALUES (1, 'lama', 'lama@example.com', 'Lama', 'x', :created)"
+        ), {"created": OLD_DATE})
+        for i in range(count):
+            # Campuran isi kecil (tetap TEXT), besar (dikompresi) dan kosong
+            content = None if i % 10 == 0 else f"catatan lama {i} " * (1 if i % 2 else 200)
+            updated_at = OLD_DATE + timedelta(days=i, minutes=i)
+            note_id = conn.execute(text(
+                "INSERT INTO notes (title, content, color, user_id, created_at, updated_at) "
+                "VALUES (:title, :content, 'yellow', 1, :created, :updated) RETURNING id"
+            ), {"title": f"note {i}", "content": content, "created": OLD_DATE, "updated": updated_at}).scalar()
+            expected[note_id] = (content, updated_at)
+            conn.execute(text(
+                "INSERT INTO todos (text, completed, created_at, user_id, priority) "
+                "VALUES (:text, 0, :created, 1, :priority)"
+            ), {"text": f"todo {i}", "created": OLD_DATE, "priority": ("high", "medium", "low")[i % 3]})
+    return expected
+
+
+def check_migrations(count: int) -> bool:
+    tmpdir = tempfile.mkdtemp()
+    engine = create_engine(f"sqlite:///{os.path.join(tmpdir, 'baseline.db')}")
+    apply_sqlite_pragmas(engine)
+    failures = []
+    try:
+        expected = seed_baseline(engine, count)
+        print(f"🔄 Migrasi database lama ({count} note, {count} todo)...")
+        applied = upgrade(engine)
+        for migration in pending_backfills(engine):
+            run_backfill(engine, migration, batch_size=max(count // 3, 1), sleep_ms=0)
+        print(f"   {len(applied)} migrasi diterapkan")
+
+        if len(applied) != len(MIGRATIONS) or pending_migrations(engine) or pending_backfills(engine):
+            failures.append("masih ada migrasi / backfill yang belum selesai")
+        if upgrade(engine):
+            failures.append("upgrade kedua menerapkan migrasi lagi")
+
+        with Session(engine) as db:
+            notes = db.execute(select(models.Note).options(undefer(models.Note.content))).scalars().all()
+            for note in notes:
+                content, updated_at = expected[note.id]
+                if note.updated_at != updated_at:
+                    failures.append(f"note {note.id}: updated_at {updated_at} berubah jadi {note.updated_at}")
+                if note.content != content:
+                    failures.append(f"note {note.id}: isi berubah")
+                if note.preview != models.note_preview(content):
+                    failures.append(f"note {note.id}: preview tidak sesuai")
+            missing_rank = db.execute(
+                select(models.Todo.id).where(models.Todo.priority_rank.is_(None))
+            ).scalars().all()
+            if missing_rank:
+                failures.append(f"{len(missing_rank)} todo tanpa priority_rank")
+    finally:
+        engine.dispose()
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    print("-" * 70)
+    for failure in failures[:20]:
+        print(f"❌ {failure}")
+    if failures:
+        return False
+    print("✅ Migrasi dari skema lama tidak mengubah data (updated_at, isi, preview, priority_rank)")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cek migrasi dari skema lama")
+    parser.add_argument("--notes", type=int, default=50)
+    args = parser.parse_args()
+    print("🔍 Mengecek migrasi...\n")
+    sys.exit(0 if check_migrations(args.notes) else 1)
@@ -0,0 +1,146 @@
+"""
+Script untuk mengecek query plan semua query di routers/ (todos, notes, sync, export)
+Gagal (exit code 1) jika ada query yang melakukan full table scan.
+Jalankan: python check_query_plans.py
+"""
+import asyncio
+import os
+import re
+import shutil
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from fastapi import Request, Response
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from database import apply_sqlite_pragmas
+from migrations import upgrade
+import models
+import schemas
+from routers import todos, notes, sync, export
+
+FULL_SCAN = re.compile(r"^SCAN (todos|notes|users|deletions)\b")
+
+
+def http():
+    """Minimal request/response pair for handlers that read headers"""
+    return {"request": Request({"type": "http", "headers": []}), "response": Response()}
+
+
+async def run_router_queries(db, user):
+    """Call every router handler once so that its SQL gets captured"""
+    todo = await todos.create_todo(
+        schemas.TodoCreate(text="Plan", due_date=datetime.utcnow() + timedelta(days=1)),
+        current_user=user, db=db
+    )
+    for sort in ("id", "created_at", "due_date", "priority"):
+        await todos.get_todos(**http(), skip=0, limit=100, sort=sort, order="asc", filters=[], current_user=user, db=db)
+    filters = todos.todo_filters(completed=False, priority="high", due_before=datetime.utcnow())
+    await todos.get_todos(**http(), skip=0, limit=100, sort="due_date", order="desc", filters=filters, current_user=user, db=db)
+    page = await todos.get_todos_page(**http(), cursor=None, limit=1, filters=[], current_user=user, db=db)
+    await todos.get_todos_page(**http(), cursor=page["next_cursor"], limit=1, filters=[], current_user=user, db=db)
+    await todos.get_todo(**http(), todo_id=todo.id, current_user=user, db=db)
+    await todos.get_todos_stats(current_user=user, db=db)
+    await todos.update_todo(todo_id=todo.id, todo_update=schemas.TodoUpdate(completed=True), current_user=user, db=db)
+    await todos.clear_completed_todos(current_user=user, db=db)
+    other = await todos.create_todo(schemas.TodoCreate(text="Other"), current_user=user, db=db)
+    await todos.delete_todo(todo_id=other.id, current_user=user, db=db)
+    batch = schemas.TodoBatchRequest(operations=[
+        {"op": "create", "todo": {"text": "Batch"}},
+        {"op": "toggle", "id": todo.id},
+        {"op": "update", "id": other.id, "changes": {"completed": True}},
+        {"op": "delete", "id": other.id + 1},
+    ])
+    await todos.batch_todos(batch, current_user=user, db=db)
+
+    note = await notes.create_note(notes.NoteCreate(title="Plan", content="isi"), db=db, current_user=user)
+    await notes.get_notes(**http(), db=db, current_user=user)
+    page = await notes.get_notes_page(**http(), cursor=None, limit=1, db=db, current_user=user)
+    await notes.get_notes_page(**http(), cursor=page["next_cursor"], limit=1, db=db, current_user=user)
+    await notes.get_note(**http(), note_id=note.id, db=db, current_user=user)
+    await notes.update_note(note_id=note.id, note_data=notes.NoteUpdate(title="Baru"), db=db, current_user=user)
+    await notes.delete_note(note_id=note.id, db=db, current_user=user)
+
+    await sync.sync(**http(), since=0, current_user=user, db=db)
+    await sync.sync(**http(), since=1, current_user=user, db=db)
+
+    async for _ in export.export_batches(db, user.id):
+        pass
+
+
+async def capture_router_queries(db_path):
+    """Seed a scratch database and return the SQL issued by the routers"""
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    apply_sqlite_pragmas(async_engine.sync_engine)
+    Session = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    captured = []
+
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")) and not executemany:
+            captured.append((statement, parameters))
+
+    try:
+        async with Session() as db:
+            user = models.User(username="plan", email="plan@example.com", name="Plan", hashed_password="x")
+            db.add(user)
+            await db.commit()
+            await db.refresh(user)
+            # Beberapa baris agar pagination punya halaman kedua
+            for i in range(3):
+                db.add(models.Todo(text=f"todo {i}", user_id=user.id))
+                db.add(models.Note(title=f"note {i}", user_id=user.id))
+            await db.commit()
+            captured.clear()
+
+            await run_router_queries(db, user)
+    finally:
+        await async_engine.dispose()
+    return captured
+
+
+def check_query_plans():
+    tmpdir = tempfile.mkdtemp()
+    db_path = os.path.join(tmpdir, "plans.db")
+    engine = create_engine(f"sqlite:///{db_path}")
+    apply_sqlite_pragmas(engine)
+    # Skema lewat migrasi (index, FTS, trigger) seperti database produksi, bukan create_all
+    upgrade(engine)
+
+    captured = asyncio.run(capture_router_queries(db_path))
+
+    failures = []
+    seen = set()
+    raw = engine.raw_connection()
+    try:
+        for statement, parameters in captured:
+            if statement in seen:
+                continue
+            seen.add(statement)
+            cursor = raw.cursor()
+            cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters)
+            plan = [row[3] for row in cursor.fetchall()]
+            cursor.close()
+            bad = [line for line in plan if FULL_SCAN.match(line)]
+            print(("❌ " if bad else "✅ ") + " ".join(statement.split())[:100])
+            for line in plan:
+                print(f"     {line}")
+            if bad:
+                failures.append(statement)
+    finally:
+        raw.close()
+        engine.dispose()
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    print("-" * 70)
+    if failures:
+        print(f"❌ {len(failures)} query melakukan full table scan")
+        return False
+    print(f"✅ {len(seen)} query dicek, tidak ada full table scan")
+    return True
+
+
+if __name__ == "__main__":
+    print("🔍 Mengecek query plan...\n")
+    sys.exit(0 if check_query_plans() else 1)
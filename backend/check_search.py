@@ -0,0 +1,106 @@
+"""
+Script untuk mengecek full-text search dengan banyak user
+Setiap user hanya boleh melihat datanya sendiri, dan waktu pencarian user
+kecil tidak boleh ikut naik karena banyaknya hasil milik user lain.
+Gagal (exit code 1) jika ada hasil bocor/hilang atau pencarian user kecil lebih
+lambat dari --max-ms.
+Jalankan: python check_search.py [--big 100000] [--users 50] [--small 2000]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from sqlalchemy import create_engine, insert, text
+import models
+from database import apply_sqlite_pragmas
+from fts import SEARCH_SQL, build_match_query
+from migrations import upgrade
+
+
+def search(conn, q: str, user_id: int, limit: int = 20):
+    match = build_match_query(q, user_id)
+    return conn.execute(text(SEARCH_SQL), {
+        "query": match, "kind": None, "open": "[", "close": "]", "tokens": 8, "limit": limit, "offset": 0,
+    }).all()
+
+
+def timed(conn, q: str, user_id: int, runs: int = 7) -> float:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        search(conn, q, user_id)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def seed(engine, big: int, users: int, small: int):
+    """User 1 has `big` todos, users 2..users+1 have `small` each; all share the word 'rapat'"""
+    with engine.begin() as conn:
+        conn.execute(insert(models.User.__table__), [
+            {"id": uid, "username": f"u{uid}", "email": f"u{uid}@example.com", "name": f"U{uid}", "hashed_password": "x"}
+            for uid in range(1, users + 2)
+        ])
+        owners = [1] * big + [uid for uid in range(2, users + 2) for _ in range(small)]
+        for start in range(0, len(owners), 20000):
+            conn.execute(insert(models.Todo.__table__), [
+                {"user_id": uid, "text": f"rapat mingguan {i}", "description": "catatan mingguan", "completed": False}
+                for i, uid in enumerate(owners[start:start + 20000], start)
+            ])
+
+
+def check_search(big: int, users: int, small: int, max_ms: float) -> bool:
+    tmpdir = tempfile.mkdtemp()
+    engine = create_engine(f"sqlite:///{os.path.join(tmpdir, 'search.db')}")
+    apply_sqlite_pragmas(engine)
+    failures = []
+    try:
+        upgrade(engine)
+        print(f"🔄 Mengisi {big + users * small} todo untuk {users + 1} user...")
+        seed(engine, big, users, small)
+
+        with engine.connect() as conn:
+            owner = {row.id: row.user_id for row in conn.execute(text("SELECT id, user_id FROM todos"))}
+            for uid in (1, 2, users + 1):
+                expected = big if uid == 1 else small
+                rows = search(conn, "rapat", uid, limit=big + 1)
+                if len(rows) != expected:
+                    failures.append(f"user {uid}: {len(rows)} hasil, seharusnya {expected}")
+                leaked = [row.item_id for row in rows if owner[row.item_id] != uid]
+                if leaked:
+                    failures.append(f"user {uid}: {len(leaked)} hasil milik user lain")
+                # Token owner ("u<id>") hanya untuk filter, bukan teks yang bisa dicari
+                if search(conn, f"u{uid}", uid):
+                    failures.append(f"user {uid}: token owner ikut cocok sebagai teks")
+
+            print(f"⏱️  user besar ({big} todo): {timed(conn, 'rapat', 1):.1f} ms")
+            # Sebelum index di-scope per user, user kecil ikut menunggu ranking semua hasil user lain
+            ms = timed(conn, "rapat", 2)
+            ok = ms <= max_ms
+            print(("✅ " if ok else "❌ ") + f"user kecil ({small} todo): {ms:.1f} ms")
+            if not ok:
+                failures.append(f"user kecil {ms:.1f} ms > {max_ms} ms")
+    finally:
+        engine.dispose()
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    print("-" * 70)
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        return False
+    print("✅ Hasil pencarian terisolasi per user")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cek full-text search multi user")
+    parser.add_argument("--big", type=int, default=100000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--small", type=int, default=2000)
+    parser.add_argument("--max-ms", type=float, default=100.0)
+    args = parser.parse_args()
+    print("🔍 Mengecek pencarian multi user...\n")
+    sys.exit(0 if check_search(args.big, args.users, args.small, args.max_ms) else 1)
@@ -0,0 +1,47 @@
+"""
+Kolom teks yang disimpan terkompresi (zlib) bila cukup besar, dipakai untuk isi note
+"""
+import zlib
+from typing import Optional, Union
+from sqlalchemy import Text
+from sqlalchemy.types import TypeDecorator
+from config import NOTE_COMPRESS_LEVEL, NOTE_COMPRESS_MIN_BYTES
+
+
+def compress_text(value: str) -> Union[str, bytes]:
+    """zlib-compressed bytes, or the text itself when small or incompressible"""
+    data = value.encode("utf-8")
+    if len(data) < NOTE_COMPRESS_MIN_BYTES:
+        return value
+    compressed = zlib.compress(data, NOTE_COMPRESS_LEVEL)
+    return compressed if len(compressed) < len(data) else value
+
+
+def decompress_text(value: Union[str, bytes, None]) -> Optional[str]:
+    """Inverse of compress_text; text values are returned unchanged"""
+    if isinstance(value, bytes):
+        return zlib.decompress(value).decode("utf-8")
+    return value
+
+
+class CompressedText(TypeDecorator):
+    """
+    Text column stored as a zlib BLOB on SQLite when large enough; rows written
+    before compression (TEXT) stay readable. Other databases store plain text
+    (PostgreSQL already compresses large values via TOAST).
+    """
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or dialect.name != "sqlite":
+            return value
+        return compress_text(value)
+
+    def process_result_value(self, value, dialect):
+        return decompress_text(value)
+
+
+def register_sqlite_functions(dbapi_connection):
+    """decompress_text() in SQL, used by the FTS triggers to index note text"""
+    dbapi_connection.create_function("decompress_text", 1, decompress_text, deterministic=True)
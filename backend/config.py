@@ -0,0 +1,149 @@
+"""
+Konfigurasi aplikasi dari environment variables (.env)
+"""
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def env_int(name: str, default: int) -> int:
+    """Read integer setting from environment"""
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def env_float(name: str, default: float) -> float:
+    """Read float setting from environment"""
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+def env_bool(name: str, default: bool) -> bool:
+    """Read boolean setting from environment"""
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# User cache untuk get_current_user
+USER_CACHE_TTL_SECONDS = env_float("USER_CACHE_TTL_SECONDS", 60.0)
+USER_CACHE_MAX_SIZE = env_int("USER_CACHE_MAX_SIZE", 1024)
+
+# Cache /api/todos/stats per user (overdue/due today ikut basi selama TTL)
+TODO_STATS_CACHE_TTL_SECONDS = env_float("TODO_STATS_CACHE_TTL_SECONDS", 60.0)
+TODO_STATS_CACHE_MAX_SIZE = env_int("TODO_STATS_CACHE_MAX_SIZE", 1024)
+
+# Username yang boleh memakai ?profile=1 (pisahkan dengan koma)
+ADMIN_USERNAMES = {name.strip() for name in os.getenv("ADMIN_USERNAMES", "").split(",") if name.strip()}
+
+# Export: jumlah baris per fetch dari cursor dan level kompresi gzip (1-9)
+EXPORT_YIELD_PER = env_int("EXPORT_YIELD_PER", 1000)
+EXPORT_GZIP_LEVEL = env_int("EXPORT_GZIP_LEVEL", 6)
+
+# Import: baris per INSERT batch (satu transaksi per batch) dan jumlah error yang dilaporkan
+IMPORT_BATCH_SIZE = env_int("IMPORT_BATCH_SIZE", 5000)
+IMPORT_MAX_ERRORS = env_int("IMPORT_MAX_ERRORS", 100)
+
+# Backup online SQLite (backup_db.py); BACKUP_INTERVAL_MINUTES=0 mematikan jadwal di dalam app
+BACKUP_DIR = os.getenv("BACKUP_DIR", "backups")
+BACKUP_KEEP = env_int("BACKUP_KEEP", 7)
+BACKUP_INTERVAL_MINUTES = env_float("BACKUP_INTERVAL_MINUTES", 0.0)
+BACKUP_PAGES_PER_STEP = env_int("BACKUP_PAGES_PER_STEP", 256)
+BACKUP_STEP_SLEEP_MS = env_float("BACKUP_STEP_SLEEP_MS", 10.0)
+BACKUP_COMPRESS = env_bool("BACKUP_COMPRESS", True)
+
+# Fast path list endpoint: select kolom saja + encode dengan orjson (tanpa validasi pydantic per baris)
+FAST_SERIALIZATION = env_bool("FAST_SERIALIZATION", False)
+
+# Rate limit per route ("jumlah/detik"); bucket per IP dan per akun (email / token)
+RATE_LIMIT_ENABLED = env_bool("RATE_LIMIT_ENABLED", True)
+RATE_LIMIT_LOGIN_PER_IP = os.getenv("RATE_LIMIT_LOGIN_PER_IP", "20/60")
+RATE_LIMIT_LOGIN_PER_ACCOUNT = os.getenv("RATE_LIMIT_LOGIN_PER_ACCOUNT", "5/60")
+RATE_LIMIT_REGISTER_PER_IP = os.getenv("RATE_LIMIT_REGISTER_PER_IP", "5/60")
+RATE_LIMIT_REGISTER_PER_ACCOUNT = os.getenv("RATE_LIMIT_REGISTER_PER_ACCOUNT", "3/60")
+RATE_LIMIT_PASSWORD_PER_ACCOUNT = os.getenv("RATE_LIMIT_PASSWORD_PER_ACCOUNT", "5/60")
+RATE_LIMIT_MAX_KEYS = env_int("RATE_LIMIT_MAX_KEYS", 100000)
+# Jumlah reverse proxy tepercaya di depan app. WAJIB diisi bila app di belakang proxy
+# (Railway, nginx, load balancer): dengan 0 semua client terlihat ber-IP proxy dan
+# limit per IP menjadi limit global. IP client diambil dari entri ke-N dari
+# kanan X-Forwarded-For (entri kiri bisa diisi bebas oleh client); 0 = IP koneksi.
+# RATE_LIMIT_TRUST_FORWARDED=true (lama) sama dengan 1 proxy.
+RATE_LIMIT_TRUSTED_PROXIES = env_int(
+    "RATE_LIMIT_TRUSTED_PROXIES", 1 if env_bool("RATE_LIMIT_TRUST_FORWARDED", False) else 0
+)
+
+# Server-Sent Events (/api/events)
+EVENTS_HEARTBEAT_SECONDS = env_float("EVENTS_HEARTBEAT_SECONDS", 15.0)
+EVENTS_QUEUE_SIZE = env_int("EVENTS_QUEUE_SIZE", 100)
+EVENTS_HISTORY_SIZE = env_int("EVENTS_HISTORY_SIZE", 200)
+EVENTS_HISTORY_USERS = env_int("EVENTS_HISTORY_USERS", 10000)
+# Lama menunggu event yang terlambat (publish terbalik) sebelum mengirim resync
+EVENTS_REORDER_SECONDS = env_float("EVENTS_REORDER_SECONDS", 1.0)
+
+# JWT: SECRET_KEY lama dipakai bila JWT_KEYS kosong.
+# Rotasi: JWT_KEYS="default:<secret lama>,2024-06:<secret baru>" + JWT_ACTIVE_KID=2024-06,
+# token lama tetap valid sampai expired, token baru ditandatangani key aktif.
+SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production")
+JWT_KEYS = os.getenv("JWT_KEYS", "")
+JWT_ACTIVE_KID = os.getenv("JWT_ACTIVE_KID", "")
+ACCESS_TOKEN_EXPIRE_MINUTES = env_int("ACCESS_TOKEN_EXPIRE_MINUTES", 30)
+REFRESH_TOKEN_EXPIRE_DAYS = env_float("REFRESH_TOKEN_EXPIRE_DAYS", 30.0)
+# Interval hapus revocation yang sudah expired + sinkron ulang daftar di memori dari database
+# (/refresh tetap mengecek tabel untuk token yang tidak ada di memori)
+REVOCATION_COMPACT_SECONDS = env_float("REVOCATION_COMPACT_SECONDS", 300.0)
+# Cache token yang sudah diverifikasi (tidak melewati exp token)
+TOKEN_CACHE_TTL_SECONDS = env_float("TOKEN_CACHE_TTL_SECONDS", 300.0)
+TOKEN_CACHE_MAX_SIZE = env_int("TOKEN_CACHE_MAX_SIZE", 10000)
+
+# Isi note >= NOTE_COMPRESS_MIN_BYTES disimpan terkompresi zlib (SQLite)
+NOTE_COMPRESS_MIN_BYTES = env_int("NOTE_COMPRESS_MIN_BYTES", 512)
+NOTE_COMPRESS_LEVEL = env_int("NOTE_COMPRESS_LEVEL", 6)
+NOTE_PREVIEW_CHARS = env_int("NOTE_PREVIEW_CHARS", 200)
+
+# Backfill migrasi: baris per transaksi dan jeda antar batch
+BACKFILL_BATCH_SIZE = env_int("BACKFILL_BATCH_SIZE", 1000)
+BACKFILL_SLEEP_MS = env_float("BACKFILL_SLEEP_MS", 50.0)
+
+# Start: terapkan migrasi saat lifespan (matikan bila sudah dijalankan di langkah pre-deploy)
+MIGRATE_ON_STARTUP = env_bool("MIGRATE_ON_STARTUP", True)
+# Interval cek ulang migrasi yang belum diterapkan (sebelum /health/ready hijau dan backfill mulai)
+MIGRATION_POLL_SECONDS = env_float("MIGRATION_POLL_SECONDS", 5.0)
+
+# Database: URL sync, URL async (opsional, default diturunkan dari DATABASE_URL)
+DATABASE_URL = os.getenv("DATABASE_URL") or "sqlite:///./todo_app.db"
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", "")
+
+# Profil SQLite, diterapkan ke setiap koneksi baru
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "cache_size": env_int("SQLITE_CACHE_SIZE", -64000),  # negatif = KiB
+    "mmap_size": env_int("SQLITE_MMAP_SIZE", 268435456),
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+    "busy_timeout": env_int("SQLITE_BUSY_TIMEOUT_MS", 5000),
+}
+
+# Ukuran connection pool
+DB_POOL_SIZE = env_int("DB_POOL_SIZE", 5)
+DB_MAX_OVERFLOW = env_int("DB_MAX_OVERFLOW", 10)
+DB_POOL_TIMEOUT = env_int("DB_POOL_TIMEOUT", 30)
+DB_POOL_RECYCLE = env_int("DB_POOL_RECYCLE", 1800)
+DB_POOL_PRE_PING = env_bool("DB_POOL_PRE_PING", True)
+
+# Password hashing: rounds pbkdf2_sha256 (default passlib: 29000)
+PASSWORD_HASH_ROUNDS = env_int("PASSWORD_HASH_ROUNDS", 29000)
+# 0 = pakai threadpool bawaan event loop, bukan process pool
+HASH_POOL_WORKERS = env_int("HASH_POOL_WORKERS", os.cpu_count() or 1)
+# Maksimum hash yang sedang berjalan + antre sebelum menolak dengan 503
+HASH_POOL_MAX_PENDING = env_int("HASH_POOL_MAX_PENDING", 4 * max(HASH_POOL_WORKERS, 1))
+HASH_POOL_RETRY_AFTER_SECONDS = env_int("HASH_POOL_RETRY_AFTER_SECONDS", 1)
+# Cara membuat worker: "spawn" atau "forkserver" (fork dari proses yang punya thread dan event loop tidak aman)
+HASH_POOL_START_METHOD = os.getenv("HASH_POOL_START_METHOD", "spawn")
+
+# Metrics: query lebih lama dari ini dicatat sebagai slow query
+SLOW_QUERY_MS = env_float("SLOW_QUERY_MS", 200.0)
+# Statement yang sama dieksekusi >= N kali dalam satu request dianggap N+1
+N_PLUS_ONE_THRESHOLD = env_int("N_PLUS_ONE_THRESHOLD", 10)
+PROFILE_INTERVAL_MS = env_float("PROFILE_INTERVAL_MS", 1.0)
@@ -1,13 +1,14 @@
 """
 Script untuk membuat user test jika database kosong
 """
-from database import SessionLocal, engine, Base
+from database import SessionLocal, engine
+from migrations import upgrade
 from models import User
 import bcrypt
 
 def create_test_user():
-    # Create tables if not exist
-    Base.metadata.create_all(bind=engine)
+    # Buat/upgrade skema database
+    upgrade(engine)
     
     db = SessionLocal()
     try:
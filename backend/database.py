@@ -1,23 +1,94 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from compression import register_sqlite_functions
+from config import (
+    ASYNC_DATABASE_URL, DATABASE_URL, DB_MAX_OVERFLOW, DB_POOL_PRE_PING, DB_POOL_RECYCLE,
+    DB_POOL_SIZE, DB_POOL_TIMEOUT, SQLITE_PRAGMAS,
+)
 
-# SQLite database
-SQLALCHEMY_DATABASE_URL = "sqlite:///./todo_app.db"
+# Database URL, default SQLite. Bisa diarahkan ke Postgres lewat DATABASE_URL
+SQLALCHEMY_DATABASE_URL = DATABASE_URL
+if SQLALCHEMY_DATABASE_URL.startswith("postgres://"):
+    # Railway/Heroku memakai skema lama yang tidak dikenal SQLAlchemy
+    SQLALCHEMY_DATABASE_URL = "postgresql://" + SQLALCHEMY_DATABASE_URL[len("postgres://"):]
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, 
-    connect_args={"check_same_thread": False}
-)
+# Driver async pengganti driver sync (default atau mis. +psycopg2, +pysqlite, +pymysql) per backend
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+def to_async_url(url: str) -> str:
+    """Convert a database URL to its async driver equivalent; ValueError if there is none"""
+    scheme, sep, rest = url.partition("://")
+    parsed = make_url(url)
+    if "+" in scheme and parsed.get_dialect().get_async_dialect_cls(parsed).is_async:
+        # Driver sudah async (mis. sqlite+aiosqlite, postgresql+psycopg)
+        return url
+    backend = scheme.partition("+")[0]
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(
+            f"Driver database {scheme!r} tidak punya pasangan async; "
+            "set ASYNC_DATABASE_URL dengan driver async (mis. postgresql+asyncpg://...)"
+        )
+    return f"{ASYNC_DRIVERS[backend]}{sep}{rest}"
+
+
+def engine_options(url: str) -> dict:
+    """Engine keyword arguments (pooling, connect_args) for the given URL"""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        options = {"connect_args": {"check_same_thread": False}}
+        if parsed.database and parsed.database != ":memory:":
+            options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+        return options
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def apply_sqlite_pragmas(sync_engine):
+    """Apply SQLITE_PRAGMAS on every new DBAPI connection of a SQLite engine"""
+    if sync_engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+        register_sqlite_functions(dbapi_connection)
+
+
+# Sync engine: untuk script (seed_data.py, check_users.py, ...) dan DDL
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_options(SQLALCHEMY_DATABASE_URL))
+apply_sqlite_pragmas(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine: untuk route handler. ASYNC_DATABASE_URL menerima driver async apa saja
+ASYNC_URL = to_async_url(ASYNC_DATABASE_URL or SQLALCHEMY_DATABASE_URL)
+
+async_engine = create_async_engine(ASYNC_URL, **engine_options(ASYNC_URL))
+apply_sqlite_pragmas(async_engine.sync_engine)
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 Base = declarative_base()
 
-# Dependency untuk mendapatkan database session
-def get_db():
-    db = SessionLocal()
-    try:
+# Dependency untuk mendapatkan database session (async)
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -0,0 +1,125 @@
+"""
+Pub/sub per user untuk Server-Sent Events (/api/events).
+Setiap perubahan todo/note dipublish setelah commit dengan id = revisi data user,
+sehingga client bisa resume lewat Last-Event-ID.
+"""
+import asyncio
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Iterable, List, Set
+from config import EVENTS_HISTORY_SIZE, EVENTS_HISTORY_USERS, EVENTS_QUEUE_SIZE
+
+
+class Subscription:
+    """Queue of events for one open stream"""
+
+    def __init__(self, broker: "EventBroker", user_id: int, maxsize: int = EVENTS_QUEUE_SIZE):
+        self.broker = broker
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False  # client terlalu lambat, event ada yang terbuang
+
+    def deliver(self, event: dict):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class EventBroker:
+    """
+    Fan-out of change events per user. LocalBroker works inside one process;
+    subclass it (e.g. Redis pub/sub) to share events between workers.
+    """
+
+    async def publish(self, user_id: int, event: dict):
+        raise NotImplementedError
+
+    def subscribe(self, user_id: int) -> Subscription:
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription: Subscription):
+        raise NotImplementedError
+
+    def history(self, user_id: int) -> List[dict]:
+        """Recent events of the user, oldest first (may be empty)"""
+        return []
+
+
+class LocalBroker(EventBroker):
+    """In-process broker with a bounded per-user history for resume"""
+
+    def __init__(self, history_size: int = EVENTS_HISTORY_SIZE, history_users: int = EVENTS_HISTORY_USERS):
+        self.history_size = history_size
+        self.history_users = history_users
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+        self._history: "OrderedDict[int, deque]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.published = 0
+
+    async def publish(self, user_id: int, event: dict):
+        with self._lock:
+            history = self._history.get(user_id)
+            if history is None:
+                history = self._history[user_id] = deque(maxlen=self.history_size)
+            history.append(event)
+            self._history.move_to_end(user_id)
+            while len(self._history) > self.history_users:
+                self._history.popitem(last=False)
+            subscribers = list(self._subscribers.get(user_id, ()))
+            self.published += 1
+        for subscription in subscribers:
+            subscription.deliver(event)
+
+    def subscribe(self, user_id: int) -> Subscription:
+        subscription = Subscription(self, user_id)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def history(self, user_id: int) -> List[dict]:
+        with self._lock:
+            return list(self._history.get(user_id, ()))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "streams": sum(len(subscribers) for subscribers in self._subscribers.values()),
+                "users": len(self._subscribers),
+                "published": self.published,
+            }
+
+
+broker = LocalBroker()
+
+
+async def publish_change(user_id: int, kind: str, action: str, ids: Iterable[int], revision: int):
+    """Publish a committed todo/note change; `revision` becomes the event id"""
+    await broker.publish(user_id, {
+        "type": kind,
+        "action": action,
+        "ids": list(ids),
+        "revision": revision,
+    })
+
+
+def missed_events(user_id: int, last_event_id: int, revision: int):
+    """
+    Events after last_event_id up to `revision` from the history, or None if the
+    history has gaps (then the client must resync via /api/sync).
+    """
+    events = [event for event in broker.history(user_id) if last_event_id < event["revision"] <= revision]
+    if [event["revision"] for event in events] != list(range(last_event_id + 1, revision + 1)):
+        return None
+    return events
@@ -0,0 +1,115 @@
+"""
+Full-text search index (SQLite FTS5) untuk notes dan todos
+
+Index disinkronkan oleh trigger SQLite, sehingga insert/update/delete lewat
+ORM maupun SQL massal (batch, clear completed) ikut ter-update. Rowid FTS
+diturunkan dari id sumber: todo = id * 2, note = id * 2 + 1. Kolom `owner`
+berisi token "u<user_id>" yang ikut di-MATCH, jadi pencarian hanya membaca
+doclist milik user tersebut (bukan meranking hasil semua user lalu memfilter). Isi note bisa
+tersimpan terkompresi, jadi trigger memakai fungsi SQL decompress_text()
+yang didaftarkan di setiap koneksi (database.apply_sqlite_pragmas).
+"""
+import re
+from sqlalchemy import text
+
+SEARCH_TABLE = "search_index"
+
+SEARCH_DDL = [
+    f"""CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5(
+        title, body, owner, kind UNINDEXED, item_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )""",
+]
+
+TRIGGER_DDL = [
+    # Todos
+    f"""CREATE TRIGGER IF NOT EXISTS todos_search_ai AFTER INSERT ON todos BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, title, body, owner, kind, item_id)
+        VALUES (new.id * 2, new.text, coalesce(new.description, ''), 'u' || new.user_id, 'todo', new.id);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS todos_search_ad AFTER DELETE ON todos BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id * 2;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS todos_search_au AFTER UPDATE OF text, description ON todos BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id * 2;
+        INSERT INTO {SEARCH_TABLE}(rowid, title, body, owner, kind, item_id)
+        VALUES (new.id * 2, new.text, coalesce(new.description, ''), 'u' || new.user_id, 'todo', new.id);
+    END""",
+    # Notes
+    f"""CREATE TRIGGER IF NOT EXISTS notes_search_ai AFTER INSERT ON notes BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, title, body, owner, kind, item_id)
+        VALUES (new.id * 2 + 1, new.title, coalesce(decompress_text(new.content), ''), 'u' || new.user_id, 'note', new.id);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS notes_search_ad AFTER DELETE ON notes BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id * 2 + 1;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS notes_search_au AFTER UPDATE OF title, content ON notes BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id * 2 + 1;
+        INSERT INTO {SEARCH_TABLE}(rowid, title, body, owner, kind, item_id)
+        VALUES (new.id * 2 + 1, new.title, coalesce(decompress_text(new.content), ''), 'u' || new.user_id, 'note', new.id);
+    END""",
+]
+
+TRIGGER_NAMES = [re.search(r"TRIGGER IF NOT EXISTS (\w+)", statement).group(1) for statement in TRIGGER_DDL]
+
+BACKFILL_SQL = [
+    f"""INSERT INTO {SEARCH_TABLE}(rowid, title, body, owner, kind, item_id)
+        SELECT id * 2, text, coalesce(description, ''), 'u' || user_id, 'todo', id FROM todos""",
+    f"""INSERT INTO {SEARCH_TABLE}(rowid, title, body, owner, kind, item_id)
+        SELECT id * 2 + 1, title, coalesce(decompress_text(content), ''), 'u' || user_id, 'note', id FROM notes""",
+]
+
+SEARCH_SQL = f"""
+    SELECT kind, item_id,
+           highlight({SEARCH_TABLE}, 0, :open, :close) AS title,
+           snippet({SEARCH_TABLE}, 1, :open, :close, '…', :tokens) AS snippet,
+           bm25({SEARCH_TABLE}, 10.0, 1.0, 0.0) AS rank
+    FROM {SEARCH_TABLE}
+    WHERE {SEARCH_TABLE} MATCH :query
+      AND (:kind IS NULL OR kind = :kind)
+    ORDER BY rank
+    LIMIT :limit OFFSET :offset
+"""
+
+
+def search_supported(bind) -> bool:
+    """FTS5 index is only available on SQLite"""
+    return bind.dialect.name == "sqlite"
+
+
+def ensure_search_index(conn):
+    """Create the FTS5 table and (re)create its triggers, backfilling existing rows once"""
+    if not search_supported(conn):
+        return
+    exists = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": SEARCH_TABLE}
+    ).first()
+    if exists:
+        columns = {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({SEARCH_TABLE})")}
+        if "owner" not in columns:
+            # Index lama (filter user_id UNINDEXED): bangun ulang dengan kolom owner
+            conn.exec_driver_sql(f"DROP TABLE {SEARCH_TABLE}")
+            exists = False
+    if not exists:
+        for statement in SEARCH_DDL:
+            conn.exec_driver_sql(statement)
+        for statement in BACKFILL_SQL:
+            conn.exec_driver_sql(statement)
+    # Buat ulang agar trigger lama ikut memakai definisi terbaru
+    for name in TRIGGER_NAMES:
+        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+    for statement in TRIGGER_DDL:
+        conn.exec_driver_sql(statement)
+
+
+def build_match_query(q: str, user_id: int) -> str:
+    """
+    Turn free text into a safe FTS5 query scoped to one user: every word as a
+    quoted prefix term on title/body, AND the user's owner token
+    """
+    terms = [term.replace('"', '""') for term in q.split()]
+    terms = " ".join(f'"{term}"*' for term in terms if term)
+    if not terms:
+        return ""
+    return f'owner : "u{user_id}" AND {{title body}} : ({terms})'
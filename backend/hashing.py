@@ -0,0 +1,154 @@
+"""
+Password hashing di process pool terbatas (bounded) dengan back-pressure
+
+passlib baru di-import saat hash pertama (lihat get_pwd_context) agar start
+aplikasi lebih cepat; startup.warm_up memuatnya di background.
+Worker dibuat dengan HASH_POOL_START_METHOD (spawn/forkserver) dan meng-import
+ulang modul __main__, jadi script yang memakai hash pool butuh
+`if __name__ == "__main__":`.
+"""
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Optional
+from fastapi import HTTPException, status
+from config import (
+    HASH_POOL_MAX_PENDING, HASH_POOL_RETRY_AFTER_SECONDS, HASH_POOL_START_METHOD, HASH_POOL_WORKERS,
+    PASSWORD_HASH_ROUNDS,
+)
+
+
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    """passlib CryptContext, created on first use"""
+    from passlib.context import CryptContext
+    return CryptContext(
+        schemes=["pbkdf2_sha256"],
+        deprecated="auto",
+        pbkdf2_sha256__rounds=PASSWORD_HASH_ROUNDS,
+    )
+
+
+def _timed_hash(password: str):
+    start = time.perf_counter()
+    hashed = get_pwd_context().hash(password)
+    return hashed, time.perf_counter() - start
+
+
+def _timed_verify(plain_password: str, hashed_password: str):
+    start = time.perf_counter()
+    valid = get_pwd_context().verify(plain_password, hashed_password)
+    return valid, time.perf_counter() - start
+
+
+def _load_pwd_context():
+    get_pwd_context()
+
+
+class HashPool:
+    """Runs hashing off the event loop and rejects work beyond `max_pending`"""
+
+    def __init__(self, workers: int, max_pending: int, retry_after: int, start_method: str = "spawn"):
+        self.workers = workers
+        self.start_method = start_method
+        self.max_pending = max_pending
+        self.retry_after = retry_after
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.hash_seconds_total = 0.0
+        self.hash_seconds_max = 0.0
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers <= 0:
+            return None
+        with self._lock:
+            if self._executor is None:
+                # Worker dibuat dengan spawn/forkserver: fork dari proses server (thread, event loop,
+                # koneksi database) bisa deadlock atau mewarisi state yang rusak
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context(self.start_method)
+                )
+            return self._executor
+
+    def _acquire(self):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Server sedang sibuk, coba lagi sebentar",
+                    headers={"Retry-After": str(self.retry_after)},
+                )
+            self.pending += 1
+
+    def _release(self, duration: Optional[float]):
+        with self._lock:
+            self.pending -= 1
+            if duration is not None:
+                self.completed += 1
+                self.hash_seconds_total += duration
+                self.hash_seconds_max = max(self.hash_seconds_max, duration)
+
+    async def run(self, func, *args):
+        """Run a _timed_* function in the pool and return its result"""
+        self._acquire()
+        duration = None
+        try:
+            loop = asyncio.get_running_loop()
+            result, duration = await loop.run_in_executor(self._get_executor(), func, *args)
+            return result
+        finally:
+            self._release(duration)
+
+    async def warm_up(self):
+        """Start the worker processes and load passlib in each of them"""
+        await asyncio.to_thread(get_pwd_context)
+        executor = self._get_executor()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(
+            loop.run_in_executor(executor, _load_pwd_context) for _ in range(max(self.workers, 1))
+        ))
+
+    def shutdown(self, wait: bool = True):
+        """Cancel queued hashes and (by default) join the worker processes"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            # wait=False meninggalkan thread manajemen executor saat interpreter keluar
+            # ("Exception ignored ... Bad file descriptor")
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def stats(self) -> dict:
+        """Counters for monitoring"""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "start_method": self.start_method,
+                "max_pending": self.max_pending,
+                "queue_depth": self.pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "hash_seconds_total": round(self.hash_seconds_total, 6),
+                "hash_seconds_max": round(self.hash_seconds_max, 6),
+            }
+
+
+hash_pool = HashPool(
+    HASH_POOL_WORKERS, HASH_POOL_MAX_PENDING, HASH_POOL_RETRY_AFTER_SECONDS, HASH_POOL_START_METHOD
+)
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash password in the hash pool"""
+    return await hash_pool.run(_timed_hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify password in the hash pool"""
+    return await hash_pool.run(_timed_verify, plain_password, hashed_password)
@@ -0,0 +1,93 @@
+"""
+Laporan waktu import (cold start) untuk `import main`
+Menjalankan `python -X importtime` di proses baru beberapa kali, lalu
+menampilkan waktu terbaik, modul paling lambat dan modul berat yang harus
+tetap lazy (gagal, exit code 1, jika ada yang ter-import saat start).
+Jalankan: python import_time.py [--runs 5] [--top 15] [--module main]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+# Modul berat yang baru dimuat saat dipakai (tokens.py, hashing.py, startup.warm_up)
+LAZY_MODULES = ("jose", "passlib", "cryptography")
+
+CHECK_LAZY = "import sys, {module}; print(','.join(m for m in {lazy!r} if m in sys.modules))"
+
+
+def parse_importtime(output: str):
+    """Rows of (module, self_us, cumulative_us, depth) from -X importtime output"""
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def subtree(rows, module: str):
+    """Rows imported by top-level `module` (children are printed before their parent)"""
+    end = next(i for i, row in enumerate(rows) if row[0] == module and row[3] == 0)
+    start = max((i for i, row in enumerate(rows[:end]) if row[3] == 0), default=-1) + 1
+    return rows[start:end + 1]
+
+
+def measure(module: str, cwd: str):
+    """Import `module` in a fresh interpreter with a throwaway SQLite database"""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{os.path.join(tmp, 'import_time.db')}"}
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=cwd, env=env, capture_output=True, text=True, check=True
+        )
+        lazy = subprocess.run(
+            [sys.executable, "-c", CHECK_LAZY.format(module=module, lazy=LAZY_MODULES)],
+            cwd=cwd, env=env, capture_output=True, text=True, check=True
+        )
+    loaded = [name for name in lazy.stdout.strip().split(",") if name]
+    return subtree(parse_importtime(result.stderr), module), loaded
+
+
+def report(module: str, runs: int, top: int) -> bool:
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    best = None
+    for _ in range(runs):
+        rows, loaded = measure(module, cwd)
+        total = rows[-1][2]
+        if best is None or total < best[0]:
+            best = (total, rows, loaded)
+    total, rows, loaded = best
+
+    print(f"⏱️  import {module}: {total / 1000:.1f} ms (terbaik dari {runs}x)\n")
+    print(f"Modul paling lambat (kumulatif, langsung di-import oleh {module}):")
+    direct = [row for row in rows if row[3] == 1]
+    for name, _, cumulative, _ in sorted(direct, key=lambda row: row[2], reverse=True)[:top]:
+        print(f"   {cumulative / 1000:8.1f} ms  {name}")
+
+    print("\nPer paket (waktu sendiri, semua level):")
+    packages = {}
+    for name, self_us, _, _ in rows:
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+    for package, self_us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f"   {self_us / 1000:8.1f} ms  {package}")
+
+    print()
+    if loaded:
+        print(f"❌ Modul berat ter-import saat start: {', '.join(loaded)}")
+        return False
+    print(f"✅ Tidak ada modul berat saat start ({', '.join(LAZY_MODULES)} lazy)")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Laporan waktu import")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--module", default="main")
+    args = parser.parse_args()
+    sys.exit(0 if report(args.module, args.runs, args.top) else 1)
@@ -1,19 +1,67 @@
+import asyncio
+import threading
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from database import engine, Base
-from routers import auth, todos, notes
+from database import engine, async_engine
+from routers import auth, todos, notes, search, sync, export, imports, events
+from auth import user_cache
+from tokens import token_cache
+from todo_stats import todo_stats_cache
+from hashing import hash_pool
+from events import broker
+from backup_db import last_backup, run_backup_schedule, sqlite_path
+from config import BACKUP_INTERVAL_MINUTES, MIGRATE_ON_STARTUP, RATE_LIMIT_ENABLED, REVOCATION_COMPACT_SECONDS
+from metrics import MetricsMiddleware, instrument_engine, registry
+from migrations import migration_status, run_backfills, upgrade
+from ratelimit import MemoryBackend, RateLimitMiddleware, rejections
+from revocation import revocations, run_revocation_compaction
+from startup import readiness, warm_up
 import models
 import os
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Instrumentasi SQL (jumlah & durasi query per request)
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Tidak ada DDL saat import: migrasi di sini (atau di langkah pre-deploy,
+    # MIGRATE_ON_STARTUP=false), backfill data berjalan di background
+    if MIGRATE_ON_STARTUP:
+        await asyncio.to_thread(upgrade, engine)
+    revocation_task = asyncio.create_task(run_revocation_compaction(REVOCATION_COMPACT_SECONDS))
+    backfill_stop = threading.Event()
+    backfill_task = asyncio.create_task(asyncio.to_thread(run_backfills, engine, backfill_stop))
+    backup_task = None
+    if BACKUP_INTERVAL_MINUTES > 0 and sqlite_path():
+        backup_task = asyncio.create_task(run_backup_schedule(BACKUP_INTERVAL_MINUTES * 60))
+    # Revocation list, pool, python-jose dan hash pool dimuat setelah server mulai; lihat /health/ready
+    warm_up_task = asyncio.create_task(warm_up())
+    yield
+    warm_up_task.cancel()
+    revocation_task.cancel()
+    # Backfill berhenti setelah batch yang sedang jalan, dilanjutkan saat start berikutnya
+    backfill_stop.set()
+    await backfill_task
+    if backup_task is not None:
+        backup_task.cancel()
+    # Hash yang masih antre dibatalkan, yang sedang jalan ditunggu lalu worker di-join
+    await asyncio.to_thread(hash_pool.shutdown)
 
 app = FastAPI(
     title="Todo List API",
     description="Backend API untuk aplikasi Todo List",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Rate limit login/register/change-password (di dalam CORS agar 429 tetap terbaca browser)
+rate_limit_backend = MemoryBackend()
+if RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware, backend=rate_limit_backend)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -21,12 +69,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Content-Disposition", "Retry-After"],
 )
+app.add_middleware(MetricsMiddleware)
 
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(todos.router, prefix="/api/todos", tags=["Todos"])
 app.include_router(notes.router, prefix="/api/notes", tags=["Notes"])
+app.include_router(search.router, prefix="/api/search", tags=["Search"])
+app.include_router(sync.router, prefix="/api/sync", tags=["Sync"])
+app.include_router(export.router, prefix="/api/export", tags=["Export"])
+app.include_router(imports.router, prefix="/api/import", tags=["Import"])
+app.include_router(events.router, prefix="/api/events", tags=["Events"])
 
 @app.get("/")
 def read_root():
@@ -39,3 +94,79 @@ def read_root():
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
+
+@app.get("/health/ready")
+def readiness_check():
+    """503 until migrations are applied and the warm-up (pool, JWT, hash pool) finished"""
+    return JSONResponse(readiness.stats(), status_code=200 if readiness.ready else 503)
+
+@app.get("/health/cache")
+def cache_stats():
+    """Hit/miss counters of in-process caches"""
+    return {cache.name: cache.stats() for cache in (user_cache, token_cache, todo_stats_cache)}
+
+@app.get("/health/hashing")
+def hashing_stats():
+    """Queue depth and duration of the password hash pool"""
+    return hash_pool.stats()
+
+@app.get("/health/ratelimit")
+def rate_limit_stats():
+    """Rejected requests per limit and bucket store size"""
+    return {"enabled": RATE_LIMIT_ENABLED, "rejected": dict(rejections), **rate_limit_backend.stats()}
+
+@app.get("/health/events")
+def events_stats():
+    """Open event streams and published events"""
+    return broker.stats()
+
+@app.get("/health/revocations")
+def revocation_stats():
+    """Revoked refresh tokens held in memory"""
+    return revocations.stats()
+
+@app.get("/health/migrations")
+def migrations_status():
+    """Applied schema migrations and backfill progress"""
+    return migration_status(engine)
+
+@app.get("/health/backup")
+def backup_status():
+    """Result of the last scheduled backup"""
+    return {"interval_minutes": BACKUP_INTERVAL_MINUTES, "last_backup": last_backup or None}
+
+def cache_metrics():
+    for cache in (user_cache, token_cache, todo_stats_cache):
+        stats = cache.stats()
+        name = stats["name"]
+        yield f"{name}_hits_total", "counter", f"{name} hits", stats["hits"]
+        yield f"{name}_misses_total", "counter", f"{name} misses", stats["misses"]
+        yield f"{name}_evictions_total", "counter", f"{name} evictions", stats["evictions"]
+        yield f"{name}_size", "gauge", f"{name} entries", stats["size"]
+
+def hashing_metrics():
+    stats = hash_pool.stats()
+    yield "password_hash_queue_depth", "gauge", "Password hashes running or queued", stats["queue_depth"]
+    yield "password_hash_completed_total", "counter", "Password hashes completed", stats["completed"]
+    yield "password_hash_rejected_total", "counter", "Password hashes rejected with 503", stats["rejected"]
+    yield "password_hash_seconds_total", "counter", "Time spent hashing passwords", stats["hash_seconds_total"]
+    yield "password_hash_seconds_max", "gauge", "Slowest password hash", stats["hash_seconds_max"]
+
+def rate_limit_metrics():
+    yield "rate_limit_rejected_total", "counter", "Requests rejected with 429", sum(rejections.values())
+    yield "rate_limit_buckets", "gauge", "Token buckets in memory", rate_limit_backend.stats()["keys"]
+
+def events_metrics():
+    stats = broker.stats()
+    yield "events_streams", "gauge", "Open /api/events streams", stats["streams"]
+    yield "events_published_total", "counter", "Change events published", stats["published"]
+
+registry.add_collector(cache_metrics)
+registry.add_collector(rate_limit_metrics)
+registry.add_collector(hashing_metrics)
+registry.add_collector(events_metrics)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus metrics"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,308 @@
+"""
+Metrics per route (format Prometheus), instrumentasi SQL dan profiling per request
+"""
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Callable, Iterable, Optional, Tuple
+from urllib.parse import parse_qs
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from config import ADMIN_USERNAMES, N_PLUS_ONE_THRESHOLD, PROFILE_INTERVAL_MS, SLOW_QUERY_MS
+from profiler import SamplingProfiler
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STAGES = ("auth", "handler", "db", "serialization")
+
+logger = logging.getLogger("todo.metrics")
+
+
+class RequestStats:
+    """Timings and SQL counters of the request being handled"""
+
+    def __init__(self):
+        self.stages = dict.fromkeys(STAGES, 0.0)
+        self.queries = 0
+        self.slow_queries = 0
+        self.statements = Counter()
+        self.endpoint_end: Optional[float] = None
+
+
+current_request: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar(
+    "current_request", default=None
+)
+
+
+def record_stage(stage: str, seconds: float):
+    """Add time spent in `stage` to the current request, if any"""
+    stats = current_request.get()
+    if stats is not None:
+        stats.stages[stage] += seconds
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class MetricsRegistry:
+    """In-process request metrics rendered in Prometheus text format"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = Counter()  # (method, route, status)
+        self.duration_buckets = defaultdict(lambda: [0] * len(DURATION_BUCKETS))
+        self.duration_sum = Counter()  # (method, route)
+        self.duration_count = Counter()
+        self.stage_seconds = Counter()  # (method, route, stage)
+        self.db_queries = Counter()  # (method, route)
+        self.slow_queries = Counter()
+        self.n_plus_one = Counter()
+        self._collectors = []
+
+    def add_collector(self, collector: Callable[[], Iterable[Tuple[str, str, str, float]]]):
+        """Register a callable returning (name, type, help, value) samples"""
+        self._collectors.append(collector)
+
+    def observe(self, method: str, route: str, status: int, duration: float, stats: RequestStats):
+        key = (method, route)
+        with self._lock:
+            self.requests[(method, route, status)] += 1
+            buckets = self.duration_buckets[key]
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    buckets[i] += 1
+            self.duration_sum[key] += duration
+            self.duration_count[key] += 1
+            for stage, seconds in stats.stages.items():
+                self.stage_seconds[(method, route, stage)] += seconds
+            self.db_queries[key] += stats.queries
+            self.slow_queries[key] += stats.slow_queries
+            if stats.statements and max(stats.statements.values()) >= N_PLUS_ONE_THRESHOLD:
+                self.n_plus_one[key] += 1
+
+    def render(self) -> str:
+        lines = []
+
+        def header(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            header("http_requests_total", "counter", "HTTP requests by route and status")
+            for (method, route, status), value in sorted(self.requests.items()):
+                lines.append(f"http_requests_total{_labels(method=method, route=route, status=status)} {value}")
+
+            header("http_request_duration_seconds", "histogram", "Request latency")
+            for (method, route), buckets in sorted(self.duration_buckets.items()):
+                for bound, value in zip(DURATION_BUCKETS, buckets):
+                    lines.append(f"http_request_duration_seconds_bucket{_labels(method=method, route=route, le=bound)} {value}")
+                count = self.duration_count[(method, route)]
+                lines.append(f"http_request_duration_seconds_bucket{_labels(method=method, route=route, le='+Inf')} {count}")
+                lines.append(f"http_request_duration_seconds_sum{_labels(method=method, route=route)} {self.duration_sum[(method, route)]:.6f}")
+                lines.append(f"http_request_duration_seconds_count{_labels(method=method, route=route)} {count}")
+
+            header("http_request_stage_seconds_total", "counter", "Time spent per stage (auth, handler, db, serialization)")
+            for (method, route, stage), value in sorted(self.stage_seconds.items()):
+                lines.append(f"http_request_stage_seconds_total{_labels(method=method, route=route, stage=stage)} {value:.6f}")
+
+            for name, counter, help_text in (
+                ("db_queries_total", self.db_queries, "SQL statements executed"),
+                ("db_slow_queries_total", self.slow_queries, f"SQL statements slower than {SLOW_QUERY_MS:g} ms"),
+                ("db_n_plus_one_requests_total", self.n_plus_one, f"Requests repeating one statement >= {N_PLUS_ONE_THRESHOLD} times"),
+            ):
+                header(name, "counter", help_text)
+                for (method, route), value in sorted(counter.items()):
+                    lines.append(f"{name}{_labels(method=method, route=route)} {value}")
+
+        for collector in self._collectors:
+            for name, kind, help_text, value in collector():
+                header(name, kind, help_text)
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def instrument_engine(sync_engine):
+    """Count and time every SQL statement against the current request"""
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        stats = current_request.get()
+        if elapsed * 1000 >= SLOW_QUERY_MS:
+            logger.warning("Slow query (%.1f ms): %s", elapsed * 1000, " ".join(statement.split())[:500])
+            if stats is not None:
+                stats.slow_queries += 1
+        if stats is not None:
+            stats.stages["db"] += elapsed
+            stats.queries += 1
+            stats.statements[statement] += 1
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start"):
+            conn.info["query_start"].pop()
+
+
+def _timed_endpoint(endpoint):
+    """Wrap a route endpoint to record its duration as the 'handler' stage"""
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                _finish_endpoint(start)
+    else:
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                _finish_endpoint(start)
+    return wrapper
+
+
+def _finish_endpoint(start: float):
+    stats = current_request.get()
+    if stats is not None:
+        now = time.perf_counter()
+        stats.stages["handler"] += now - start
+        stats.endpoint_end = now
+
+
+class TimedRoute(APIRoute):
+    """APIRoute that splits request time into handler and serialization"""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            response = await handler(request)
+            stats = current_request.get()
+            if stats is not None and stats.endpoint_end is not None:
+                stats.stages["serialization"] += time.perf_counter() - stats.endpoint_end
+            return response
+
+        return timed_handler
+
+
+def _profiling_requested(scope) -> bool:
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return query.get("profile", [""])[0] in ("1", "true")
+
+
+def _is_admin(scope) -> bool:
+    """Check the bearer token of the request against ADMIN_USERNAMES"""
+    from auth import decode_username
+
+    headers = dict(scope.get("headers") or [])
+    authorization = headers.get(b"authorization", b"").decode("latin-1")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    username = decode_username(token)
+    return username is not None and username in ADMIN_USERNAMES
+
+
+def _route_template(scope) -> str:
+    """Route label with path parameters replaced by their names, e.g. /api/todos/{todo_id}"""
+    if scope.get("route") is None:
+        return "unmatched"
+    values = {str(value): name for name, value in (scope.get("path_params") or {}).items()}
+    segments = scope["path"].split("/")
+    return "/".join(f"{{{values[segment]}}}" if segment in values else segment for segment in segments)
+
+
+class MetricsMiddleware:
+    """ASGI middleware: per-route metrics, N+1 detection and ?profile=1"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = _profiling_requested(scope)
+        if profile and not _is_admin(scope):
+            await _send_text(send, 403, "Profiling hanya untuk admin\n")
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            if not profile:
+                await send(message)
+
+        profiler = None
+        if profile:
+            profiler = SamplingProfiler(threading.get_ident(), PROFILE_INTERVAL_MS / 1000).start()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            if profiler is not None:
+                profiler.stop()
+            current_request.reset(token)
+            route_path = _route_template(scope)
+            registry.observe(scope["method"], route_path, status_code, duration, stats)
+            self._log_n_plus_one(scope["method"], route_path, stats)
+
+        if profiler is not None:
+            await _send_text(send, 200, profiler.folded(), {
+                "x-profile-status": str(status_code),
+                "x-profile-duration-ms": f"{duration * 1000:.3f}",
+                "x-profile-samples": str(sum(profiler.samples.values())),
+                "x-profile-db-queries": str(stats.queries),
+                "x-profile-db-ms": f"{stats.stages['db'] * 1000:.3f}",
+            })
+
+    @staticmethod
+    def _log_n_plus_one(method, route, stats):
+        if not stats.statements:
+            return
+        statement, count = stats.statements.most_common(1)[0]
+        if count >= N_PLUS_ONE_THRESHOLD:
+            logger.warning(
+                "Possible N+1 on %s %s: statement executed %d times: %s",
+                method, route, count, " ".join(statement.split())[:300]
+            )
+
+
+async def _send_text(send, status: int, body: str, headers: Optional[dict] = None):
+    payload = body.encode("utf-8")
+    raw_headers = [
+        (b"content-type", b"text/plain; charset=utf-8"),
+        (b"content-length", str(len(payload)).encode()),
+    ]
+    raw_headers += [(key.encode(), value.encode()) for key, value in (headers or {}).items()]
+    await send({"type": "http.response.start", "status": status, "headers": raw_headers})
+    await send({"type": "http.response.body", "body": payload})
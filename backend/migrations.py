@@ -0,0 +1,355 @@
+"""
+Migrasi skema database (pengganti create_all + ALTER TABLE otomatis)
+
+Setiap migrasi punya versi berurutan dan dicatat di tabel schema_migrations.
+upgrade() menjalankan bagian DDL yang cepat; backfill data berjalan terpisah
+per batch (BACKFILL_BATCH_SIZE baris per transaksi, jeda BACKFILL_SLEEP_MS)
+sehingga tabel besar tidak terkunci lama, dan dilanjutkan dari posisi
+terakhir setelah restart.
+
+Helper DDL di sini idempotent, jadi database lama yang dibuat dengan
+create_all (tanpa schema_migrations) aman dimigrasi dari awal.
+
+Jalankan: python migrations.py                (upgrade + semua backfill)
+          python migrations.py --no-backfill  (DDL saja, backfill oleh server)
+          python migrations.py --status
+"""
+import argparse
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, List, Optional
+from sqlalchemy import (
+    Column, DateTime, Integer, MetaData, String, Table, bindparam, case, insert, inspect, select, text, update
+)
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.schema import CreateIndex
+import models
+from config import BACKFILL_BATCH_SIZE, BACKFILL_SLEEP_MS, MIGRATION_POLL_SECONDS
+from database import Base, engine
+from fts import ensure_search_index
+
+logger = logging.getLogger("todo.migrations")
+
+# Kunci advisory (Postgres) / named lock (MySQL) untuk migration_lock
+MIGRATION_LOCK_ID = 240024
+MIGRATION_LOCK_NAME = "todo_schema_migrations"
+
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", String(32), primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+    # id terakhir yang sudah di-backfill (untuk resume) dan waktu backfill selesai
+    Column("backfill_position", Integer, nullable=True),
+    Column("backfilled_at", DateTime, nullable=True),
+)
+
+
+@dataclass
+class Backfill:
+    """
+    Data migration over `table` in primary key order: `apply(conn, rows)` updates
+    one batch of rows (id + `columns`, filtered by `where`) in its own transaction.
+    Must be idempotent, rows written by the app meanwhile may be visited too.
+    Core UPDATEs still fire `onupdate` defaults: set such columns (e.g.
+    notes.updated_at) to themselves, a backfill is not a user change.
+    """
+    table: Table
+    columns: tuple
+    apply: Callable
+    where: tuple = ()
+
+
+@dataclass
+class Migration:
+    version: str
+    description: str
+    upgrade: Callable  # (conn) -> None; hanya DDL/perubahan cepat
+    backfill: Optional[Backfill] = None
+
+
+# Helper DDL (idempotent)
+
+def add_column(conn, table: Table, name: str):
+    """ALTER TABLE ADD COLUMN from the model definition, unless it already exists"""
+    if name in {column["name"] for column in inspect(conn).get_columns(table.name)}:
+        return
+    column = table.c[name]
+    ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=conn.dialect)}"
+    if column.server_default is not None:
+        ddl += f" DEFAULT {column.server_default.arg}"
+        if not column.nullable:
+            ddl += " NOT NULL"
+    conn.exec_driver_sql(ddl)
+
+
+def create_tables(conn, *tables: Table):
+    Base.metadata.create_all(conn, tables=list(tables), checkfirst=True)
+
+
+def create_indexes(conn, *tables: Table):
+    # IF NOT EXISTS: reflection tidak mengenali index berbasis ekspresi
+    for table in tables:
+        for index in table.indexes:
+            conn.execute(CreateIndex(index, if_not_exists=True))
+
+
+# Migrasi
+
+users = models.User.__table__
+todos = models.Todo.__table__
+notes = models.Note.__table__
+
+
+def _base_tables(conn):
+    create_tables(conn, users, todos, notes)
+
+
+def _todo_fields(conn):
+    for name in ("category", "priority", "description"):
+        add_column(conn, todos, name)
+
+
+def _revisions(conn):
+    for table in (users, todos, notes):
+        add_column(conn, table, "revision")
+    create_tables(conn, models.Deletion.__table__)
+
+
+def _priority_rank(conn):
+    add_column(conn, todos, "priority_rank")
+
+
+def _backfill_priority_rank(conn, rows):
+    conn.execute(
+        update(todos)
+        .where(todos.c.id.between(rows[0].id, rows[-1].id))
+        .values(priority_rank=case(models.PRIORITY_RANKS, value=todos.c.priority, else_=len(models.PRIORITY_RANKS)))
+    )
+
+
+def _indexes(conn):
+    create_indexes(conn, users, todos, notes, models.Deletion.__table__)
+
+
+def _search_index(conn):
+    ensure_search_index(conn)
+
+
+def _token_revocations(conn):
+    create_tables(conn, models.TokenRevocation.__table__)
+
+
+def _token_revocation_indexes(conn):
+    create_indexes(conn, models.TokenRevocation.__table__)
+
+
+def _note_preview(conn):
+    add_column(conn, notes, "preview")
+
+
+def _backfill_note_storage(conn, rows):
+    # Tulis ulang lewat CompressedText: isi besar jadi BLOB zlib, preview diisi.
+    # updated_at di-set ke dirinya sendiri agar onupdate tidak menimpanya (isi note tidak berubah)
+    conn.execute(update(notes).where(notes.c.id == bindparam("note_id")).values(updated_at=notes.c.updated_at), [
+        {"note_id": row.id, "content": row.content, "preview": models.note_preview(row.content)}
+        for row in rows
+    ])
+
+
+MIGRATIONS: List[Migration] = [
+    Migration("0001", "Tabel users, todos, notes", _base_tables),
+    Migration("0002", "Kolom todos.category, priority, description", _todo_fields),
+    Migration("0003", "Kolom revision + tabel deletions (ETag, sync)", _revisions),
+    Migration(
+        "0004", "Kolom todos.priority_rank", _priority_rank,
+        Backfill(todos, (), _backfill_priority_rank),
+    ),
+    Migration("0005", "Composite index per user", _indexes),
+    Migration("0006", "Full-text search index (FTS5) + trigger", _search_index),
+    Migration("0007", "Tabel token_revocations", _token_revocations),
+    Migration(
+        "0008", "Kolom notes.preview + kompresi isi note", _note_preview,
+        Backfill(notes, (notes.c.content,), _backfill_note_storage, (notes.c.preview.is_(None), notes.c.content.isnot(None))),
+    ),
+    # ensure_search_index membangun ulang index lama tanpa kolom owner
+    Migration("0009", "Search index di-scope per user (kolom owner)", _search_index),
+    Migration("0010", "Index token_revocations (jti, user_id)", _token_revocation_indexes),
+]
+
+
+@contextmanager
+def migration_lock(bind, poll_seconds: float = MIGRATION_POLL_SECONDS):
+    """
+    Connection in a transaction that holds the migration lock, committed on exit.
+    Other processes (e.g. several workers starting at once) wait until it is released.
+    """
+    dialect = bind.dialect.name
+    with bind.connect() as conn:
+        if dialect == "sqlite":
+            # BEGIN IMMEDIATE: hanya satu penulis; busy_timeout bisa habis selama migrasi panjang
+            waiting = False
+            while True:
+                try:
+                    conn.exec_driver_sql("BEGIN IMMEDIATE")
+                    break
+                except OperationalError as exc:
+                    if "locked" not in str(exc):
+                        raise
+                    conn.rollback()
+                    if not waiting:
+                        logger.info("Menunggu migrasi yang sedang berjalan di proses lain")
+                        waiting = True
+                    time.sleep(poll_seconds)
+        elif dialect == "postgresql":
+            conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        elif dialect == "mysql":
+            conn.execute(text("SELECT GET_LOCK(:name, -1)"), {"name": MIGRATION_LOCK_NAME})
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            if dialect == "mysql":
+                conn.rollback()
+                conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": MIGRATION_LOCK_NAME})
+
+
+def upgrade(bind=engine) -> List[str]:
+    """Apply pending migrations (DDL only) and return their versions"""
+    if not pending_migrations(bind):
+        return []
+    done = []
+    for migration in MIGRATIONS:
+        with migration_lock(bind) as conn:
+            # Cek ulang setelah dapat lock: worker lain mungkin baru saja menerapkannya
+            schema_migrations.create(conn, checkfirst=True)
+            applied = conn.execute(
+                select(schema_migrations.c.version).where(schema_migrations.c.version == migration.version)
+            ).first()
+            if applied:
+                continue
+            migration.upgrade(conn)
+            now = datetime.utcnow()
+            conn.execute(insert(schema_migrations).values(
+                version=migration.version,
+                description=migration.description,
+                applied_at=now,
+                backfill_position=0 if migration.backfill else None,
+                backfilled_at=None if migration.backfill else now,
+            ))
+        logger.info("Migrasi %s diterapkan: %s", migration.version, migration.description)
+        done.append(migration.version)
+    return done
+
+
+def run_backfill(bind, migration: Migration, stop: Optional[threading.Event] = None,
+                 batch_size: int = BACKFILL_BATCH_SIZE, sleep_ms: float = BACKFILL_SLEEP_MS) -> bool:
+    """Run one backfill to completion (True) or until `stop` is set (False)"""
+    backfill = migration.backfill
+    table = backfill.table
+    version = schema_migrations.c.version == migration.version
+    with bind.connect() as conn:
+        position = conn.execute(select(schema_migrations.c.backfill_position).where(version)).scalar() or 0
+    processed = 0
+    while not (stop is not None and stop.is_set()):
+        with bind.begin() as conn:
+            rows = conn.execute(
+                select(table.c.id, *backfill.columns)
+                .where(table.c.id > position, *backfill.where)
+                .order_by(table.c.id)
+                .limit(batch_size)
+            ).all()
+            if rows:
+                backfill.apply(conn, rows)
+                position = rows[-1].id
+                processed += len(rows)
+                conn.execute(update(schema_migrations).where(version).values(backfill_position=position))
+            else:
+                conn.execute(update(schema_migrations).where(version).values(backfilled_at=datetime.utcnow()))
+        if not rows:
+            logger.info("Backfill %s selesai (%d baris)", migration.version, processed)
+            return True
+        # Beri kesempatan request lain menulis di antara batch
+        time.sleep(sleep_ms / 1000)
+    return False
+
+
+def pending_migrations(bind=engine) -> List[str]:
+    """Versions not applied yet (all of them on a fresh database)"""
+    if not inspect(bind).has_table(schema_migrations.name):
+        return [migration.version for migration in MIGRATIONS]
+    with bind.connect() as conn:
+        applied = set(conn.execute(select(schema_migrations.c.version)).scalars())
+    return [migration.version for migration in MIGRATIONS if migration.version not in applied]
+
+
+def pending_backfills(bind=engine) -> List[Migration]:
+    with bind.connect() as conn:
+        pending = set(conn.execute(
+            select(schema_migrations.c.version).where(schema_migrations.c.backfilled_at.is_(None))
+        ).scalars())
+    return [migration for migration in MIGRATIONS if migration.version in pending and migration.backfill]
+
+
+def run_backfills(bind=engine, stop: Optional[threading.Event] = None,
+                  poll_seconds: float = MIGRATION_POLL_SECONDS):
+    """Run pending backfills in order; used as a background thread at startup"""
+    try:
+        # Tanpa MIGRATE_ON_STARTUP, tunggu DDL dari langkah pre-deploy
+        while pending_migrations(bind):
+            if stop is None or stop.wait(poll_seconds):
+                return
+        for migration in pending_backfills(bind):
+            if not run_backfill(bind, migration, stop):
+                return
+    except Exception:
+        logger.exception("Backfill gagal, dilanjutkan saat start berikutnya")
+
+
+def migration_status(bind=engine) -> List[dict]:
+    rows = {}
+    if inspect(bind).has_table(schema_migrations.name):
+        with bind.connect() as conn:
+            rows = {row.version: row for row in conn.execute(select(schema_migrations))}
+    status = []
+    for migration in MIGRATIONS:
+        row = rows.get(migration.version)
+        status.append({
+            "version": migration.version,
+            "description": migration.description,
+            "applied_at": row.applied_at.isoformat() if row else None,
+            "backfill": None if migration.backfill is None else (
+                "done" if row and row.backfilled_at else "pending" if row else None
+            ),
+            "backfill_position": row.backfill_position if row else None,
+        })
+    return status
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrasi skema database")
+    parser.add_argument("--status", action="store_true", help="tampilkan status migrasi saja")
+    parser.add_argument("--no-backfill", action="store_true", help="terapkan DDL saja, backfill dijalankan server")
+    args = parser.parse_args()
+
+    if not args.status:
+        print("🔄 Menjalankan migrasi...\n")
+        applied = upgrade()
+        print(f"✅ {len(applied)} migrasi diterapkan" + (f": {', '.join(applied)}" if applied else ""))
+        if not args.no_backfill:
+            for migration in pending_backfills():
+                print(f"🔄 Backfill {migration.version} ({migration.description})...")
+                run_backfill(engine, migration)
+        print()
+
+    print("-" * 70)
+    for item in migration_status():
+        mark = "✅" if item["applied_at"] else "⏳"
+        backfill = f"  [backfill {item['backfill']}]" if item["backfill"] else ""
+        print(f"{mark} {item['version']}  {item['description']}{backfill}")
+    print("-" * 70)
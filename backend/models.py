@@ -1,6 +1,8 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Float, ForeignKey, Index
+from sqlalchemy.orm import deferred, relationship, validates
 from datetime import datetime
+from compression import CompressedText
+from config import NOTE_PREVIEW_CHARS
 from database import Base
 
 class User(Base):
@@ -12,12 +14,22 @@ class User(Base):
     name = Column(String, nullable=False)
     hashed_password = Column(String, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Naik setiap kali todos/notes user berubah (dipakai untuk ETag)
+    revision = Column(Integer, nullable=False, default=0, server_default="0")
     
     # Relationship
     todos = relationship("Todo", back_populates="owner", cascade="all, delete-orphan")
     notes = relationship("Note", back_populates="user", cascade="all, delete-orphan")
 
 
+# Urutan sorting prioritas (sama dengan frontend); nilai lain di paling akhir
+PRIORITY_RANKS = {"high": 0, "medium": 1, "low": 2}
+
+
+def priority_rank(priority) -> int:
+    return PRIORITY_RANKS.get(priority, len(PRIORITY_RANKS))
+
+
 class Todo(Base):
     __tablename__ = "todos"
 
@@ -32,22 +44,106 @@ class Todo(Base):
     category = Column(String, nullable=True)  # Kategori: Sekolah, Kerja, Pribadi, dll
     priority = Column(String, default="medium")  # Prioritas: high, medium, low
     description = Column(String, nullable=True)  # Deskripsi/catatan tambahan
+    revision = Column(Integer, nullable=False, default=0, server_default="0")  # User.revision saat terakhir diubah
+    # priority sebagai angka untuk ORDER BY (lihat PRIORITY_RANKS)
+    priority_rank = Column(Integer, nullable=False, default=1, server_default="1")
     
     # Relationship
     owner = relationship("User", back_populates="todos")
 
+    @validates("priority")
+    def _sync_priority_rank(self, key, value):
+        self.priority_rank = priority_rank(value)
+        return value
+
+    # Composite index untuk akses per-user
+    __table_args__ = (
+        Index("ix_todos_user_id_completed", user_id, completed),
+        Index("ix_todos_user_id_due_date", user_id, due_date),
+        Index("ix_todos_user_id_created_at", user_id, created_at.desc(), id.desc()),
+        Index("ix_todos_user_id_revision", user_id, revision),
+        Index("ix_todos_user_id_id", user_id, id),
+        Index("ix_todos_user_id_priority_rank", user_id, priority_rank, id),
+        # Todo tanpa due date selalu di akhir saat sort=due_date
+        Index("ix_todos_user_id_due_date_nulls_last", user_id, due_date.is_(None), due_date, id),
+        # Covering index untuk GROUP BY di /api/todos/stats
+        Index("ix_todos_user_id_stats", user_id, category, priority, completed, due_date),
+    )
+
+
+def note_preview(content):
+    """Start of the note on one line, shown on note cards"""
+    if not content:
+        return None
+    text = " ".join(content.split())
+    return text if len(text) <= NOTE_PREVIEW_CHARS else text[:NOTE_PREVIEW_CHARS].rstrip() + "…"
+
 
 class Note(Base):
     __tablename__ = "notes"
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(200), nullable=False)
-    content = Column(Text, nullable=True)
+    # Isi lengkap hanya dimuat bila diminta (undefer); list memakai preview
+    content = deferred(Column(CompressedText, nullable=True))
+    preview = Column(String, nullable=True)
     category = Column(String(50), nullable=True)
     color = Column(String(20), default='yellow')
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    revision = Column(Integer, nullable=False, default=0, server_default="0")  # User.revision saat terakhir diubah
 
     # Relationship
     user = relationship("User", back_populates="notes")
+
+    @validates("content")
+    def _sync_preview(self, key, value):
+        self.preview = note_preview(value)
+        return value
+
+    # Composite index untuk akses per-user
+    __table_args__ = (
+        Index("ix_notes_user_id_updated_at", user_id, updated_at.desc(), id.desc()),
+        Index("ix_notes_user_id_revision", user_id, revision),
+        Index("ix_notes_user_id_id", user_id, id),
+    )
+
+
+class Deletion(Base):
+    """Tombstone todo/note yang dihapus, untuk incremental sync"""
+    __tablename__ = "deletions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    kind = Column(String(10), nullable=False)  # todo / note
+    item_id = Column(Integer, nullable=False)
+    revision = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_deletions_user_id_revision", user_id, revision),
+    )
+
+
+class TokenRevocation(Base):
+    """
+    Refresh token yang dicabut. jti terisi = satu token; jti kosong = semua
+    token user yang dibuat sebelum revoked_at (mis. setelah ganti password).
+    Waktu dalam epoch detik, sama dengan claim iat/exp JWT.
+    """
+    __tablename__ = "token_revocations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    jti = Column(String(64), nullable=True)
+    revoked_at = Column(Float, nullable=False)
+    # Setelah waktu ini token yang dicabut sudah expired, baris boleh dihapus
+    expires_at = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index("ix_token_revocations_expires_at", expires_at),
+        # Cek per token saat /refresh (pencabutan dari worker lain)
+        Index("ix_token_revocations_jti", jti),
+        Index("ix_token_revocations_user_id_revoked_at", user_id, revoked_at),
+    )
@@ -0,0 +1,58 @@
+"""
+Keyset (cursor) pagination helpers
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import literal, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def encode_cursor(sort_value: datetime, row_id: int) -> str:
+    """Encode (sort value, id) of the last row into an opaque cursor"""
+    raw = json.dumps([sort_value.isoformat() if sort_value else None, row_id])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    """Decode cursor produced by encode_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return (datetime.fromisoformat(sort_value) if sort_value else None), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor tidak valid"
+        )
+
+
+async def paginate_keyset(
+    db: AsyncSession, stmt, sort_column, id_column, cursor: Optional[str], limit: int, as_dicts: bool = False
+):
+    """
+    Apply a stable (sort_column DESC, id DESC) order and the keyset condition
+    for `cursor` to a select() statement, then return (rows, next_cursor).
+    With as_dicts the statement selects columns and rows are returned as dicts.
+    """
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        # Row value (bukan OR) agar SQLite bisa langsung lompat ke cursor lewat index
+        stmt = stmt.where(
+            tuple_(sort_column, id_column) < tuple_(literal(sort_value, sort_column.type), literal(row_id, id_column.type))
+        )
+    stmt = stmt.order_by(sort_column.desc(), id_column.desc()).limit(limit + 1)
+    result = await db.execute(stmt)
+    rows = [dict(row) for row in result.mappings()] if as_dicts else result.scalars().all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        if as_dicts:
+            next_cursor = encode_cursor(last[sort_column.key], last[id_column.key])
+        else:
+            next_cursor = encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+    return rows, next_cursor
@@ -0,0 +1,43 @@
+"""
+Sampling profiler sederhana: output dalam format "folded stacks" yang bisa
+langsung dipakai flamegraph.pl / speedscope
+"""
+import sys
+import threading
+from collections import Counter
+
+
+class SamplingProfiler:
+    """Samples the stack of one thread every `interval` seconds"""
+
+    def __init__(self, thread_id: int, interval: float = 0.001, max_depth: int = 128):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self) -> str:
+        """One `frame;frame;frame count` line per unique stack"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common()) + "\n"
@@ -0,0 +1,233 @@
+"""
+Rate limiting dengan token bucket per IP dan per akun, sebagai ASGI middleware.
+Request yang ditolak langsung dijawab 429 tanpa masuk ke route (dan password hashing).
+"""
+import json
+import logging
+import math
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+from config import (
+    RATE_LIMIT_LOGIN_PER_ACCOUNT,
+    RATE_LIMIT_LOGIN_PER_IP,
+    RATE_LIMIT_MAX_KEYS,
+    RATE_LIMIT_PASSWORD_PER_ACCOUNT,
+    RATE_LIMIT_REGISTER_PER_ACCOUNT,
+    RATE_LIMIT_REGISTER_PER_IP,
+    RATE_LIMIT_TRUSTED_PROXIES,
+)
+
+logger = logging.getLogger("todo.ratelimit")
+
+# Body lebih besar dari ini tidak dibaca untuk mencari akun
+MAX_ACCOUNT_BODY_BYTES = 64 * 1024
+
+# Jumlah request yang ditolak per nama limit
+rejections = Counter()
+
+
+@dataclass(frozen=True)
+class Limit:
+    """`limit` requests per `period` seconds, keyed by client IP or account"""
+    name: str
+    limit: int
+    period: float
+    key: str = "ip"  # ip | email (field di JSON body) | token (subject bearer token)
+
+    @classmethod
+    def parse(cls, name: str, spec: str, key: str = "ip") -> "Limit":
+        """Build from a "requests/seconds" string such as "5/60" """
+        limit, _, period = spec.partition("/")
+        return cls(name, int(limit), float(period or 1), key)
+
+
+class RateLimitBackend:
+    """Token bucket storage; subclass to share buckets between processes (e.g. Redis)"""
+
+    async def hit(self, key: str, limit: int, period: float) -> float:
+        """Take one token; return 0 if allowed, else seconds until one is available"""
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {}
+
+
+class MemoryBackend(RateLimitBackend):
+    """
+    In-process buckets with LRU eviction after `maxsize` keys.
+    `clock` can be replaced by a fake for deterministic tests.
+    """
+
+    def __init__(self, maxsize: int = RATE_LIMIT_MAX_KEYS, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.clock = clock
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    async def hit(self, key: str, limit: int, period: float) -> float:
+        now = self.clock()
+        rate = limit / period
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (float(limit), now))
+            tokens = min(float(limit), tokens + (now - updated_at) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+                self.evictions += 1
+        return 0.0 if allowed else (1 - tokens) / rate
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"keys": len(self._buckets), "maxsize": self.maxsize, "evictions": self.evictions}
+
+
+# Limit default per (method, path)
+DEFAULT_RULES: Dict[Tuple[str, str], List[Limit]] = {
+    ("POST", "/api/auth/login"): [
+        Limit.parse("login_ip", RATE_LIMIT_LOGIN_PER_IP),
+        Limit.parse("login_account", RATE_LIMIT_LOGIN_PER_ACCOUNT, key="email"),
+    ],
+    ("POST", "/api/auth/register"): [
+        Limit.parse("register_ip", RATE_LIMIT_REGISTER_PER_IP),
+        Limit.parse("register_account", RATE_LIMIT_REGISTER_PER_ACCOUNT, key="email"),
+    ],
+    ("PUT", "/api/auth/change-password"): [
+        Limit.parse("password_account", RATE_LIMIT_PASSWORD_PER_ACCOUNT, key="token"),
+    ],
+}
+
+
+def client_ip(scope, trusted_proxies: int = RATE_LIMIT_TRUSTED_PROXIES) -> str:
+    """
+    Client address for per-IP limits. Behind `trusted_proxies` proxies that each append
+    to X-Forwarded-For, the client is the Nth entry from the right; entries further
+    left come from the client itself and are ignored.
+    """
+    if trusted_proxies > 0:
+        hops = [
+            hop.strip()
+            for name, value in scope.get("headers") or []
+            if name == b"x-forwarded-for"
+            for hop in value.decode("latin-1").split(",")
+        ]
+        hops = [hop for hop in hops if hop]
+        if len(hops) >= trusted_proxies:
+            return hops[-trusted_proxies]
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def _token_subject(scope) -> Optional[str]:
+    from auth import decode_username
+
+    headers = dict(scope.get("headers") or [])
+    scheme, _, token = headers.get(b"authorization", b"").decode("latin-1").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return decode_username(token)
+
+
+async def _read_body(receive) -> Tuple[bytes, list]:
+    """Read the request body, keeping the messages so they can be replayed"""
+    body, messages = b"", []
+    while True:
+        message = await receive()
+        messages.append(message)
+        if message["type"] != "http.request":
+            break
+        body += message.get("body", b"")
+        if not message.get("more_body") or len(body) > MAX_ACCOUNT_BODY_BYTES:
+            break
+    return body, messages
+
+
+def _email_from_body(body: bytes) -> Optional[str]:
+    try:
+        email = json.loads(body).get("email")
+    except (ValueError, AttributeError):
+        return None
+    return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+
+class RateLimitMiddleware:
+    """ASGI middleware applying token bucket `rules` per (method, path)"""
+
+    def __init__(self, app, rules: Dict[Tuple[str, str], List[Limit]] = None, backend: RateLimitBackend = None):
+        self.app = app
+        self.rules = DEFAULT_RULES if rules is None else rules
+        self.backend = backend or MemoryBackend()
+        self._warned_forwarded = False
+
+    async def __call__(self, scope, receive, send):
+        limits = None
+        if scope["type"] == "http":
+            limits = self.rules.get((scope["method"], scope["path"].rstrip("/") or "/"))
+        if not limits:
+            await self.app(scope, receive, send)
+            return
+
+        if any(limit.key == "email" for limit in limits):
+            body, messages = await _read_body(receive)
+            receive = self._replay(messages, receive)
+            email = _email_from_body(body)
+        else:
+            email = None
+
+        for limit in limits:
+            if limit.key == "ip":
+                subject = client_ip(scope)
+                self._warn_forwarded(scope)
+            elif limit.key == "email":
+                subject = email
+            else:
+                subject = _token_subject(scope)
+            if subject is None:
+                continue  # request tidak valid, biar route yang menolak
+            retry_after = await self.backend.hit(f"{limit.name}:{subject}", limit.limit, limit.period)
+            if retry_after > 0:
+                rejections[limit.name] += 1
+                await self._reject(send, retry_after)
+                return
+
+        await self.app(scope, receive, send)
+
+    def _warn_forwarded(self, scope):
+        """Log once when a proxy header arrives but RATE_LIMIT_TRUSTED_PROXIES is 0"""
+        if self._warned_forwarded or RATE_LIMIT_TRUSTED_PROXIES > 0:
+            return
+        if any(name == b"x-forwarded-for" for name, _ in scope.get("headers") or []):
+            self._warned_forwarded = True
+            logger.warning(
+                "Request lewat proxy (X-Forwarded-For) tapi RATE_LIMIT_TRUSTED_PROXIES=0: "
+                "semua client dihitung dengan IP proxy %s", client_ip(scope)
+            )
+
+    @staticmethod
+    def _replay(messages: list, receive):
+        async def replay_receive():
+            if messages:
+                return messages.pop(0)
+            return await receive()
+        return replay_receive
+
+    @staticmethod
+    async def _reject(send, retry_after: float):
+        body = json.dumps({"detail": "Terlalu banyak percobaan, coba lagi nanti"}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
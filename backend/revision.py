@@ -0,0 +1,70 @@
+"""
+Revisi data per user: ETag, conditional GET (If-None-Match) dan tombstone untuk sync
+"""
+from typing import Iterable, Optional
+from fastapi import Request, Response, status
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+import models
+from tokens import TokenUser
+
+
+async def bump_revision(db: AsyncSession, user_id: int) -> int:
+    """Increment the user's data revision inside the current transaction"""
+    result = await db.execute(
+        update(models.User)
+        .where(models.User.id == user_id)
+        .values(revision=models.User.revision + 1)
+        .returning(models.User.revision),
+        execution_options={"synchronize_session": False}
+    )
+    return result.scalar_one()
+
+
+async def get_revision(db: AsyncSession, user_id: int) -> int:
+    """Current data revision of the user (primary key lookup)"""
+    result = await db.execute(select(models.User.revision).where(models.User.id == user_id))
+    return result.scalar_one()
+
+
+async def record_deletions(db: AsyncSession, user_id: int, kind: str, item_ids: Iterable[int], revision: int):
+    """Insert tombstones for deleted todos/notes"""
+    rows = [
+        {"user_id": user_id, "kind": kind, "item_id": item_id, "revision": revision}
+        for item_id in item_ids
+    ]
+    if rows:
+        await db.execute(insert(models.Deletion), rows)
+
+
+def make_etag(user_id: int, revision: int) -> str:
+    return f'W/"{user_id}-{revision}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against etag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+async def not_modified(request: Request, response: Response, db: AsyncSession, user: TokenUser) -> Optional[Response]:
+    """
+    Return a 304 response if the client's ETag is current; otherwise set the
+    ETag on `response` and return None so the handler builds the payload.
+    """
+    etag = make_etag(user.id, await get_revision(db, user.id))
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
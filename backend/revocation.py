@@ -0,0 +1,131 @@
+"""
+Refresh token yang dicabut: disimpan di tabel token_revocations dan dicerminkan
+di memori, sehingga /api/auth/refresh tidak perlu query database
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from sqlalchemy import and_, delete, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+import models
+from config import REFRESH_TOKEN_EXPIRE_DAYS
+from database import AsyncSessionLocal
+
+logger = logging.getLogger("todo.revocation")
+
+# (user_id, jti, revoked_at, expires_at); jti None = semua token milik user
+Revocation = Tuple[int, Optional[str], float, float]
+
+
+class RevocationList:
+    """In-memory mirror of token_revocations; entries drop out once expired"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.jtis: Dict[str, float] = {}  # jti -> expires_at
+        self.users: Dict[int, Tuple[float, float]] = {}  # user_id -> (revoked_at, expires_at)
+        # False sampai dimuat pertama kali dari database (startup.warm_up)
+        self.loaded = False
+
+    def is_revoked(self, claims: dict) -> bool:
+        """Check a decoded refresh token (needs jti, uid, iat)"""
+        if claims["jti"] in self.jtis:
+            return True
+        entry = self.users.get(claims["uid"])
+        return entry is not None and claims.get("iat", 0) <= entry[0]
+
+    def add(self, user_id: int, jti, revoked_at: float, expires_at: float):
+        with self._lock:
+            if jti is not None:
+                self.jtis[jti] = expires_at
+            else:
+                current = self.users.get(user_id)
+                if current is None or current[0] < revoked_at:
+                    self.users[user_id] = (revoked_at, expires_at)
+
+    def replace(self, rows):
+        """Rebuild from (user_id, jti, revoked_at, expires_at) rows"""
+        fresh = RevocationList()
+        for row in rows:
+            fresh.add(*row)
+        with self._lock:
+            self.jtis, self.users = fresh.jtis, fresh.users
+            self.loaded = True
+
+    def compact(self, now: float):
+        with self._lock:
+            self.jtis = {jti: exp for jti, exp in self.jtis.items() if exp > now}
+            self.users = {uid: entry for uid, entry in self.users.items() if entry[1] > now}
+
+    def stats(self) -> dict:
+        return {"loaded": self.loaded, "tokens": len(self.jtis), "users": len(self.users)}
+
+
+revocations = RevocationList()
+
+# revoke_* hanya menambah baris ke session dan mengembalikan entry-nya; caller
+# memanggil revocations.add(*entry) setelah commit berhasil, agar memori tidak
+# berisi pencabutan yang di-rollback
+
+
+async def is_revoked_in_db(db: AsyncSession, claims: dict) -> bool:
+    """
+    Look the token up in token_revocations, for revocations made by other workers
+    since the last reload; a hit is added to the in-memory list
+    """
+    table = models.TokenRevocation
+    row = (await db.execute(
+        select(table.user_id, table.jti, table.revoked_at, table.expires_at)
+        .where(or_(
+            table.jti == claims["jti"],
+            and_(table.user_id == claims["uid"], table.jti.is_(None), table.revoked_at >= claims.get("iat", 0)),
+        ))
+        .limit(1)
+    )).first()
+    if row is None:
+        return False
+    revocations.add(*row)
+    return True
+
+
+def revoke_refresh_token(db: AsyncSession, claims: dict) -> Revocation:
+    """Revoke one refresh token until it would have expired anyway (committed by the caller)"""
+    revoked_at = time.time()
+    db.add(models.TokenRevocation(
+        user_id=claims["uid"], jti=claims["jti"], revoked_at=revoked_at, expires_at=claims["exp"]
+    ))
+    return claims["uid"], claims["jti"], revoked_at, claims["exp"]
+
+
+def revoke_user_refresh_tokens(db: AsyncSession, user_id: int) -> Revocation:
+    """Revoke every refresh token issued to the user so far (committed by the caller)"""
+    revoked_at = time.time()
+    expires_at = revoked_at + REFRESH_TOKEN_EXPIRE_DAYS * 86400
+    db.add(models.TokenRevocation(user_id=user_id, jti=None, revoked_at=revoked_at, expires_at=expires_at))
+    return user_id, None, revoked_at, expires_at
+
+
+async def load_revocations(compact: bool = False):
+    """Reload the in-memory list from the database, deleting expired rows first if asked"""
+    now = time.time()
+    table = models.TokenRevocation
+    async with AsyncSessionLocal() as db:
+        if compact:
+            await db.execute(delete(table).where(table.expires_at <= now))
+            await db.commit()
+        result = await db.execute(
+            select(table.user_id, table.jti, table.revoked_at, table.expires_at).where(table.expires_at > now)
+        )
+        revocations.replace(result.all())
+
+
+async def run_revocation_compaction(interval_seconds: float):
+    """Background task: drop expired revocations and pick up ones made by other workers"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await load_revocations(compact=True)
+        except Exception:
+            logger.exception("Compaction token_revocations gagal")
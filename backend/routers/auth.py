@@ -1,26 +1,32 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import models
 import schemas
 from database import get_db
+from hashing import hash_password_async, verify_password_async
+from metrics import TimedRoute
+from revocation import is_revoked_in_db, revocations, revoke_refresh_token, revoke_user_refresh_tokens
+from tokens import decode_refresh_token
 from auth import (
     authenticate_user,
     create_access_token,
-    get_password_hash,
+    create_refresh_token,
+    token_claims,
     get_user_by_username,
     get_user_by_email,
     get_current_user,
+    invalidate_cached_user,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 @router.post("/register", response_model=schemas.UserResponse, status_code=status.HTTP_201_CREATED)
-def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
+async def register(user: schemas.UserCreate, db: AsyncSession = Depends(get_db)):
     """Register new user"""
     # Check if username already exists
-    db_user = get_user_by_username(db, username=user.username)
+    db_user = await get_user_by_username(db, username=user.username)
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -28,7 +34,7 @@ def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
         )
     
     # Check if email already exists
-    db_user_email = get_user_by_email(db, email=user.email)
+    db_user_email = await get_user_by_email(db, email=user.email)
     if db_user_email:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -36,7 +42,7 @@ def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await hash_password_async(user.password)
     db_user = models.User(
         username=user.username,
         email=user.email,
@@ -44,25 +50,26 @@ def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
         hashed_password=hashed_password
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     # Create access token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": db_user.username}, expires_delta=access_token_expires
+        data=token_claims(db_user), expires_delta=access_token_expires
     )
     
     return {
         "user": db_user,
         "access_token": access_token,
-        "token_type": "bearer"
+        "token_type": "bearer",
+        "refresh_token": create_refresh_token(db_user)
     }
 
 @router.post("/login", response_model=schemas.UserResponse)
-def login(user_credentials: schemas.UserLogin, db: Session = Depends(get_db)):
+async def login(user_credentials: schemas.UserLogin, db: AsyncSession = Depends(get_db)):
     """Login user with email"""
-    user = authenticate_user(db, user_credentials.email, user_credentials.password)
+    user = await authenticate_user(db, user_credentials.email, user_credentials.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -73,52 +80,94 @@ def login(user_credentials: schemas.UserLogin, db: Session = Depends(get_db)):
     # Create access token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data=token_claims(user), expires_delta=access_token_expires
     )
     
     return {
         "user": user,
         "access_token": access_token,
-        "token_type": "bearer"
+        "token_type": "bearer",
+        "refresh_token": create_refresh_token(user)
     }
 
+async def valid_refresh_claims(refresh_token: str, db: AsyncSession) -> dict:
+    """Decode a refresh token and check it against the revocation list, then the database"""
+    if not revocations.loaded:
+        # Daftar pencabutan belum dimuat (server baru start), jangan terima token apa pun
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server sedang bersiap, coba lagi sebentar",
+            headers={"Retry-After": "1"},
+        )
+    claims = decode_refresh_token(refresh_token)
+    # Miss di memori tetap dicek ke database: pencabutan dari worker lain baru dimuat
+    # ulang tiap REVOCATION_COMPACT_SECONDS
+    if claims is None or revocations.is_revoked(claims) or await is_revoked_in_db(db, claims):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token tidak valid atau sudah dicabut",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return claims
+
+@router.post("/refresh", response_model=schemas.Token)
+async def refresh(request: schemas.RefreshRequest, db: AsyncSession = Depends(get_db)):
+    """New access token from a refresh token (no password hashing, one indexed revocation lookup)"""
+    claims = await valid_refresh_claims(request.refresh_token, db)
+    access_token = create_access_token(
+        data={key: claims.get(key) for key in ("sub", "uid", "name")},
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    return {"access_token": access_token, "token_type": "bearer"}
+
+@router.post("/logout")
+async def logout(request: schemas.RefreshRequest, db: AsyncSession = Depends(get_db)):
+    """Revoke the given refresh token"""
+    claims = await valid_refresh_claims(request.refresh_token, db)
+    revoked = revoke_refresh_token(db, claims)
+    await db.commit()
+    revocations.add(*revoked)
+    return {"message": "Logout berhasil"}
+
 @router.get("/me", response_model=schemas.User)
-def get_current_user_info(current_user: models.User = Depends(get_current_user)):
+async def get_current_user_info(current_user: models.User = Depends(get_current_user)):
     """Get current user information"""
     return current_user
 
 @router.put("/profile", response_model=schemas.User)
-def update_profile(
+async def update_profile(
     profile_update: schemas.UserProfileUpdate,
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update user profile (name only)"""
     if profile_update.name:
         current_user.name = profile_update.name
     
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    invalidate_cached_user(current_user.username)
+    await db.refresh(current_user)
     return current_user
 
 @router.put("/change-password")
-def change_password(
+async def change_password(
     password_data: schemas.PasswordChange,
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Change user password"""
-    from auth import verify_password
-    
     # Verify old password
-    if not verify_password(password_data.old_password, current_user.hashed_password):
+    if not await verify_password_async(password_data.old_password, current_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Password lama tidak sesuai"
         )
     
-    # Update to new password
-    current_user.hashed_password = get_password_hash(password_data.new_password)
-    db.commit()
+    # Update to new password; semua refresh token lama ikut dicabut
+    current_user.hashed_password = await hash_password_async(password_data.new_password)
+    revoked = revoke_user_refresh_tokens(db, current_user.id)
+    await db.commit()
+    revocations.add(*revoked)
+    invalidate_cached_user(current_user.username)
     
     return {"message": "Password berhasil diubah"}
@@ -0,0 +1,97 @@
+import asyncio
+import json
+from typing import Dict, Optional
+from fastapi import APIRouter, Depends, Header, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from auth import get_stream_user
+from tokens import TokenUser
+from config import EVENTS_HEARTBEAT_SECONDS, EVENTS_REORDER_SECONDS
+from database import get_db
+from events import broker, missed_events
+from metrics import TimedRoute
+from revision import get_revision
+
+router = APIRouter(route_class=TimedRoute)
+
+def format_event(event: dict) -> str:
+    return f"id: {event['revision']}\nevent: change\ndata: {json.dumps(event)}\n\n"
+
+def format_resync(since: int, revision: int) -> str:
+    return f"event: resync\ndata: {json.dumps({'since': since, 'revision': revision})}\n\n"
+
+async def event_stream(subscription, last_event_id: Optional[int], revision: int,
+                       reorder_seconds: float = EVENTS_REORDER_SECONDS):
+    loop = asyncio.get_running_loop()
+    try:
+        yield "retry: 5000\n\n"
+        sent = revision
+        if last_event_id is not None and last_event_id < revision:
+            missed = missed_events(subscription.user_id, last_event_id, revision)
+            if missed is None:
+                yield format_resync(last_event_id, revision)
+            else:
+                for event in missed:
+                    yield format_event(event)
+
+        # Revisi per user berurutan (+1 per commit), tapi dua commit paralel bisa
+        # publish terbalik: event yang mendahului ditahan sampai celahnya terisi,
+        # atau resync bila celah tidak terisi dalam reorder_seconds
+        early: Dict[int, dict] = {}
+        deadline = None
+        while True:
+            timeout = EVENTS_HEARTBEAT_SECONDS if deadline is None else max(0.0, deadline - loop.time())
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                if deadline is None:
+                    yield ": ping\n\n"
+                    continue
+                latest = max(early)
+                yield format_resync(sent, latest)
+                sent, early, deadline = latest, {}, None
+                continue
+            if subscription.overflowed:
+                # Client tertinggal: buang antrean, minta sync ulang
+                subscription.overflowed = False
+                latest = max(event["revision"], *early, sent)
+                while not subscription.queue.empty():
+                    latest = max(latest, subscription.queue.get_nowait()["revision"])
+                yield format_resync(sent, latest)
+                sent, early, deadline = latest, {}, None
+                continue
+            if event["revision"] <= sent:
+                continue  # sudah terkirim dari history atau tercakup resync
+            early[event["revision"]] = event
+            while sent + 1 in early:
+                sent += 1
+                yield format_event(early.pop(sent))
+            if not early:
+                deadline = None
+            elif deadline is None:
+                deadline = loop.time() + reorder_seconds
+    finally:
+        subscription.close()
+
+@router.get("/")
+async def stream_events(
+    last_event_id: Optional[int] = Header(None),
+    since: Optional[int] = Query(None, ge=0),
+    current_user: TokenUser = Depends(get_stream_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Server-Sent Events stream of the user's todo/note changes. Event id is the
+    data revision; reconnecting with Last-Event-ID (or ?since=) replays missed
+    events, or sends `resync` when they are no longer available.
+    """
+    # Subscribe dulu agar tidak ada event yang terlewat di antara baca revisi dan stream
+    subscription = broker.subscribe(current_user.id)
+    revision = await get_revision(db, current_user.id)
+    # Stream bisa terbuka lama: lepaskan koneksi database sekarang
+    await db.close()
+    return StreamingResponse(
+        event_stream(subscription, last_event_id if last_event_id is not None else since, revision),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
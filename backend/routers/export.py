@@ -0,0 +1,101 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+import models
+from auth import get_token_user
+from tokens import TokenUser
+from config import EXPORT_GZIP_LEVEL, EXPORT_YIELD_PER
+from database import AsyncSessionLocal
+from metrics import TimedRoute
+
+router = APIRouter(route_class=TimedRoute)
+
+# Kolom yang diekspor per jenis data
+TODO_FIELDS = ("id", "text", "completed", "due_date", "category", "priority", "description", "created_at")
+NOTE_FIELDS = ("id", "title", "content", "category", "color", "created_at", "updated_at")
+CSV_FIELDS = ("type",) + tuple(dict.fromkeys(TODO_FIELDS + NOTE_FIELDS))
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+def _value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+async def export_batches(db: AsyncSession, user_id: int, type: Optional[str] = None):
+    """Yield lists of row dicts per server-side cursor fetch (EXPORT_YIELD_PER rows)"""
+    sources = (("todo", models.Todo, TODO_FIELDS), ("note", models.Note, NOTE_FIELDS))
+    for kind, model, fields in sources:
+        if type and kind != type:
+            continue
+        stmt = (
+            select(*(getattr(model, field) for field in fields))
+            .where(model.user_id == user_id)
+            .order_by(model.id)
+            .execution_options(yield_per=EXPORT_YIELD_PER)
+        )
+        result = await db.stream(stmt)
+        async for partition in result.partitions():
+            yield [
+                {"type": kind, **{field: _value(value) for field, value in zip(fields, row)}}
+                for row in partition
+            ]
+
+async def ndjson_chunks(batches):
+    async for batch in batches:
+        yield "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in batch)
+
+async def csv_chunks(batches):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+    async for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+async def gzip_chunks(chunks, level: int):
+    """Compress text chunks into one gzip stream as they are produced"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+async def export_stream(user_id: int, format: str, type: Optional[str], gzip: bool):
+    # Session sendiri karena generator ini berjalan setelah handler selesai
+    async with AsyncSessionLocal() as db:
+        encode = ndjson_chunks if format == "ndjson" else csv_chunks
+        chunks = encode(export_batches(db, user_id, type))
+        if gzip:
+            chunks = gzip_chunks(chunks, EXPORT_GZIP_LEVEL)
+        async for chunk in chunks:
+            yield chunk
+
+@router.get("/")
+async def export(
+    request: Request,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    type: Optional[Literal["todo", "note"]] = None,
+    current_user: TokenUser = Depends(get_token_user)
+):
+    """Stream the user's todos and notes as NDJSON or CSV"""
+    gzip = "gzip" in request.headers.get("accept-encoding", "").lower()
+    filename = f"export-{datetime.utcnow():%Y%m%d-%H%M%S}.{format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"', "Vary": "Accept-Encoding"}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        export_stream(current_user.id, format, type, gzip),
+        media_type=MEDIA_TYPES[format],
+        headers=headers
+    )
@@ -0,0 +1,184 @@
+import codecs
+import csv
+import json
+from datetime import datetime
+from typing import Dict, List, Literal, Optional
+from fastapi import APIRouter, Depends, Request
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+import models
+import schemas
+from auth import get_token_user
+from tokens import TokenUser
+from config import IMPORT_BATCH_SIZE, IMPORT_MAX_ERRORS
+from database import get_db
+from metrics import TimedRoute
+from revision import bump_revision
+from routers.notes import NoteCreate
+from todo_stats import invalidate_todo_stats
+from events import publish_change
+
+router = APIRouter(route_class=TimedRoute)
+
+# Format baris sama dengan /api/export; created_at dipertahankan jika ada
+class TodoImport(schemas.TodoCreate):
+    created_at: Optional[datetime] = None
+
+class NoteImport(NoteCreate):
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+class ImportRowError(BaseModel):
+    row: int
+    error: str
+
+class ImportResult(BaseModel):
+    imported: Dict[str, int]
+    failed: int
+    errors: List[ImportRowError]
+    errors_truncated: bool = False
+
+async def read_lines(request: Request):
+    """Decode the streamed request body into lines without buffering it whole"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    async for chunk in request.stream():
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+async def ndjson_records(lines):
+    """Yield (row number, dict or error message) per non-empty line"""
+    row = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            data = json.loads(line)
+        except ValueError:
+            yield row, "JSON tidak valid"
+            continue
+        yield row, data if isinstance(data, dict) else "Baris harus berupa objek JSON"
+
+async def csv_records(lines):
+    """Yield (row number, dict) per CSV record; quoted fields may span lines"""
+    header = None
+    row = 0
+    record = ""
+    async for line in lines:
+        record += line
+        if record.count('"') % 2:
+            continue  # field dengan quote belum ditutup
+        text, record = record, ""
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        row += 1
+        # Sel kosong di CSV berarti nilai tidak diisi
+        yield row, {name: value for name, value in zip(header, values) if value != ""}
+    if record.strip():
+        row += 1
+        yield row, "Quote tidak ditutup"
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" for item in error.errors()
+    )
+
+async def insert_batch(db: AsyncSession, user_id: int, todos: list, notes: list):
+    """Insert validated rows with executemany in one transaction, then publish one event"""
+    revision = await bump_revision(db, user_id)
+    now = datetime.utcnow()
+    if todos:
+        await db.execute(insert(models.Todo), [
+            {
+                **todo.model_dump(exclude={"created_at"}),
+                "user_id": user_id,
+                "priority_rank": models.priority_rank(todo.priority),
+                "created_at": todo.created_at or now,
+                "revision": revision,
+            }
+            for todo in todos
+        ])
+    if notes:
+        await db.execute(insert(models.Note), [
+            {
+                **note.model_dump(exclude={"created_at", "updated_at"}),
+                "user_id": user_id,
+                "preview": models.note_preview(note.content),
+                "created_at": note.created_at or now,
+                "updated_at": note.updated_at or note.created_at or now,
+                "revision": revision,
+            }
+            for note in notes
+        ])
+    await db.commit()
+    # id baris baru tidak diambil (executemany); client cukup sync dari revisi sebelumnya
+    kind = "note" if not todos else "todo" if not notes else "all"
+    await publish_change(user_id, kind, "import", [], revision)
+
+@router.post("/", response_model=ImportResult)
+async def import_data(
+    request: Request,
+    format: Optional[Literal["ndjson", "csv"]] = None,
+    type: Literal["todo", "note"] = "todo",
+    current_user: TokenUser = Depends(get_token_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Import todos/notes from a streamed NDJSON or CSV body (format of /api/export).
+    Rows without a `type` field use the `type` query parameter.
+    """
+    if format is None:
+        format = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+    parse = csv_records if format == "csv" else ndjson_records
+    schemas_by_type = {"todo": TodoImport, "note": NoteImport}
+
+    imported = {"todo": 0, "note": 0}
+    errors, failed = [], 0
+    pending = {"todo": [], "note": []}
+
+    async for row, data in parse(read_lines(request)):
+        if isinstance(data, dict):
+            kind = data.get("type", type)
+            schema = schemas_by_type.get(kind)
+            if schema is None:
+                data = f"Type tidak dikenal: {kind}"
+            else:
+                try:
+                    pending[kind].append(schema(**data))
+                except ValidationError as error:
+                    data = _validation_message(error)
+        if isinstance(data, str):
+            failed += 1
+            if len(errors) < IMPORT_MAX_ERRORS:
+                errors.append({"row": row, "error": data})
+
+        if len(pending["todo"]) + len(pending["note"]) >= IMPORT_BATCH_SIZE:
+            await insert_batch(db, current_user.id, pending["todo"], pending["note"])
+            for kind in pending:
+                imported[kind] += len(pending[kind])
+            pending = {"todo": [], "note": []}
+
+    if pending["todo"] or pending["note"]:
+        await insert_batch(db, current_user.id, pending["todo"], pending["note"])
+        for kind in pending:
+            imported[kind] += len(pending[kind])
+    if imported["todo"]:
+        invalidate_todo_stats(current_user.id)
+
+    return {
+        "imported": imported,
+        "failed": failed,
+        "errors": errors,
+        "errors_truncated": failed > len(errors),
+    }
@@ -1,13 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer
+from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime
 from database import get_db
-from models import Note, User
-from routers.auth import get_current_user
+from models import Note
+from auth import get_token_user
+from tokens import TokenUser
+from pagination import paginate_keyset
+from revision import bump_revision, not_modified, record_deletions
+from events import publish_change
+from metrics import TimedRoute
+from config import FAST_SERIALIZATION
+from serialization import FastJSONResponse, rows_as_dicts, schema_columns
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 # Pydantic schemas
 class NoteCreate(BaseModel):
@@ -31,65 +40,131 @@ class NoteResponse(BaseModel):
     user_id: int
     created_at: datetime
     updated_at: datetime
+    revision: int = 0
 
     class Config:
         from_attributes = True
 
+class NoteSummary(BaseModel):
+    """Note card for list endpoints: preview instead of the full content"""
+    id: int
+    title: str
+    preview: str | None
+    category: str | None
+    color: str
+    user_id: int
+    created_at: datetime
+    updated_at: datetime
+    revision: int = 0
 
-# GET all notes
-@router.get("/", response_model=List[NoteResponse])
-def get_notes(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    class Config:
+        from_attributes = True
+
+class NotePage(BaseModel):
+    items: List[NoteSummary]
+    next_cursor: str | None = None
+
+
+async def get_user_note(db: AsyncSession, note_id: int, user_id: int):
+    result = await db.execute(
+        select(Note).options(undefer(Note.content)).where(Note.id == note_id, Note.user_id == user_id)
+    )
+    note = result.scalars().first()
+    if not note:
+        raise HTTPException(status_code=404, detail="Note not found")
+    return note
+
+
+# GET all notes (tanpa isi lengkap, lihat GET /{note_id})
+@router.get("/", response_model=List[NoteSummary])
+async def get_notes(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user)
+):
+    cached = await not_modified(request, response, db, current_user)
+    if cached:
+        return cached
+    columns = schema_columns(NoteSummary, Note) if FAST_SERIALIZATION else [Note]
+    result = await db.execute(
+        select(*columns).where(Note.user_id == current_user.id).order_by(Note.updated_at.desc(), Note.id.desc())
+    )
+    if FAST_SERIALIZATION:
+        return FastJSONResponse(rows_as_dicts(result), headers=response.headers)
+    return result.scalars().all()
+
+
+# GET notes page (keyset pagination)
+@router.get("/page", response_model=NotePage)
+async def get_notes_page(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user)
 ):
-    notes = db.query(Note).filter(Note.user_id == current_user.id).order_by(Note.updated_at.desc()).all()
-    return notes
+    cached = await not_modified(request, response, db, current_user)
+    if cached:
+        return cached
+    columns = schema_columns(NoteSummary, Note) if FAST_SERIALIZATION else [Note]
+    stmt = select(*columns).where(Note.user_id == current_user.id)
+    notes, next_cursor = await paginate_keyset(
+        db, stmt, Note.updated_at, Note.id, cursor, limit, as_dicts=FAST_SERIALIZATION
+    )
+    if FAST_SERIALIZATION:
+        return FastJSONResponse({"items": notes, "next_cursor": next_cursor}, headers=response.headers)
+    return {"items": notes, "next_cursor": next_cursor}
 
 
 # GET single note
 @router.get("/{note_id}", response_model=NoteResponse)
-def get_note(
+async def get_note(
     note_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user)
 ):
-    note = db.query(Note).filter(Note.id == note_id, Note.user_id == current_user.id).first()
-    if not note:
-        raise HTTPException(status_code=404, detail="Note not found")
+    cached = await not_modified(request, response, db, current_user)
+    if cached:
+        return cached
+    note = await get_user_note(db, note_id, current_user.id)
     return note
 
 
 # CREATE note
 @router.post("/", response_model=NoteResponse)
-def create_note(
+async def create_note(
     note_data: NoteCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user)
 ):
     new_note = Note(
         title=note_data.title,
         content=note_data.content,
         category=note_data.category,
         color=note_data.color,
-        user_id=current_user.id
+        user_id=current_user.id,
+        revision=await bump_revision(db, current_user.id)
     )
     db.add(new_note)
-    db.commit()
-    db.refresh(new_note)
+    await db.commit()
+    # Tanpa refresh: id & default sudah terisi, refresh akan membuang content (deferred)
+    await publish_change(current_user.id, "note", "create", [new_note.id], new_note.revision)
     return new_note
 
 
 # UPDATE note
 @router.put("/{note_id}", response_model=NoteResponse)
-def update_note(
+async def update_note(
     note_id: int,
     note_data: NoteUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user)
 ):
-    note = db.query(Note).filter(Note.id == note_id, Note.user_id == current_user.id).first()
-    if not note:
-        raise HTTPException(status_code=404, detail="Note not found")
+    note = await get_user_note(db, note_id, current_user.id)
     
     if note_data.title is not None:
         note.title = note_data.title
@@ -101,22 +176,25 @@ def update_note(
         note.color = note_data.color
     
     note.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(note)
+    note.revision = await bump_revision(db, current_user.id)
+    await db.commit()
+    await db.refresh(note)
+    await publish_change(current_user.id, "note", "update", [note.id], note.revision)
     return note
 
 
 # DELETE note
 @router.delete("/{note_id}")
-def delete_note(
+async def delete_note(
     note_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: TokenUser = Depends(get_token_user)
 ):
-    note = db.query(Note).filter(Note.id == note_id, Note.user_id == current_user.id).first()
-    if not note:
-        raise HTTPException(status_code=404, detail="Note not found")
+    note = await get_user_note(db, note_id, current_user.id)
     
-    db.delete(note)
-    db.commit()
+    await db.delete(note)
+    revision = await bump_revision(db, current_user.id)
+    await record_deletions(db, current_user.id, "note", [note_id], revision)
+    await db.commit()
+    await publish_change(current_user.id, "note", "delete", [note_id], revision)
     return {"message": "Note deleted successfully"}
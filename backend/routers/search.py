@@ -0,0 +1,65 @@
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from pydantic import BaseModel
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db, async_engine
+from auth import get_token_user
+from tokens import TokenUser
+from fts import SEARCH_SQL, build_match_query, search_supported
+from metrics import TimedRoute
+
+router = APIRouter(route_class=TimedRoute)
+
+class SearchResult(BaseModel):
+    type: str
+    id: int
+    title: str
+    snippet: str
+    rank: float
+
+class SearchResponse(BaseModel):
+    items: List[SearchResult]
+    next_offset: Optional[int] = None
+
+@router.get("/", response_model=SearchResponse)
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    type: Optional[Literal["todo", "note"]] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    current_user: TokenUser = Depends(get_token_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Ranked full-text search over the user's notes and todos"""
+    if not search_supported(async_engine):
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Pencarian hanya tersedia untuk database SQLite"
+        )
+
+    match = build_match_query(q, current_user.id)
+    if not match:
+        return {"items": [], "next_offset": None}
+
+    result = await db.execute(text(SEARCH_SQL), {
+        "query": match,
+        "kind": type,
+        "open": "<mark>",
+        "close": "</mark>",
+        "tokens": 16,
+        "limit": limit + 1,
+        "offset": offset,
+    })
+    rows = result.all()
+
+    next_offset = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_offset = offset + limit
+
+    items = [
+        {"type": row.kind, "id": row.item_id, "title": row.title, "snippet": row.snippet, "rank": row.rank}
+        for row in rows
+    ]
+    return {"items": items, "next_offset": next_offset}
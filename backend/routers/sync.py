@@ -0,0 +1,92 @@
+from typing import List
+from fastapi import APIRouter, Depends, Query, Request, Response
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer
+import models
+import schemas
+from database import get_db
+from auth import get_token_user
+from tokens import TokenUser
+from revision import get_revision, make_etag, etag_matches
+from routers.notes import NoteResponse
+from metrics import TimedRoute
+from config import FAST_SERIALIZATION
+from serialization import FastJSONResponse, rows_as_dicts, schema_columns
+
+router = APIRouter(route_class=TimedRoute)
+
+class Tombstone(BaseModel):
+    type: str
+    id: int
+    revision: int
+
+class SyncResponse(BaseModel):
+    revision: int
+    todos: List[schemas.Todo]
+    notes: List[NoteResponse]
+    deleted: List[Tombstone]
+
+def revision_window(column, since: int, revision: int):
+    """Filter for rows changed in (since, revision]"""
+    if since:
+        return (column > since, column <= revision)
+    return (column <= revision,)
+
+@router.get("/", response_model=SyncResponse)
+async def sync(
+    request: Request,
+    response: Response,
+    since: int = Query(0, ge=0),
+    current_user: TokenUser = Depends(get_token_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Changes since revision `since`: created/updated todos and notes plus
+    tombstones of deleted ones. since=0 returns the full dataset.
+    Store the returned `revision` and send it as `since` next time.
+    """
+    # Batas atas dibaca dulu, perubahan setelahnya ikut di sync berikutnya
+    revision = await get_revision(db, current_user.id)
+    etag = make_etag(current_user.id, revision)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+    todo_columns = schema_columns(schemas.Todo, models.Todo) if FAST_SERIALIZATION else [models.Todo]
+    note_columns = schema_columns(NoteResponse, models.Note) if FAST_SERIALIZATION else [models.Note]
+    todos = await db.execute(select(*todo_columns).where(
+        models.Todo.user_id == current_user.id, *revision_window(models.Todo.revision, since, revision)
+    ).order_by(models.Todo.revision, models.Todo.id))
+    note_stmt = select(*note_columns).where(
+        models.Note.user_id == current_user.id, *revision_window(models.Note.revision, since, revision)
+    ).order_by(models.Note.revision, models.Note.id)
+    if not FAST_SERIALIZATION:
+        # Sync butuh isi lengkap (kolom content di-defer secara default)
+        note_stmt = note_stmt.options(undefer(models.Note.content))
+    notes = await db.execute(note_stmt)
+
+    deleted = []
+    if since:
+        result = await db.execute(select(models.Deletion).where(
+            models.Deletion.user_id == current_user.id, *revision_window(models.Deletion.revision, since, revision)
+        ).order_by(models.Deletion.revision))
+        deleted = [
+            {"type": row.kind, "id": row.item_id, "revision": row.revision}
+            for row in result.scalars().all()
+        ]
+
+    if FAST_SERIALIZATION:
+        return FastJSONResponse({
+            "revision": revision,
+            "todos": rows_as_dicts(todos),
+            "notes": rows_as_dicts(notes),
+            "deleted": deleted,
+        }, headers=response.headers)
+    return {
+        "revision": revision,
+        "todos": todos.scalars().all(),
+        "notes": notes.scalars().all(),
+        "deleted": deleted,
+    }
@@ -1,38 +1,31 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import asc, delete, desc, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 import models
 import schemas
 from database import get_db
-from auth import get_current_user
+from auth import get_token_user
+from tokens import TokenUser
+from pagination import paginate_keyset
+from revision import bump_revision, not_modified, record_deletions
+from metrics import TimedRoute
+from config import FAST_SERIALIZATION
+from serialization import FastJSONResponse, rows_as_dicts, schema_columns
+from todo_stats import get_todo_stats, invalidate_todo_stats
+from events import publish_change
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
-@router.get("/", response_model=List[schemas.Todo])
-def get_todos(
-    skip: int = 0,
-    limit: int = 100,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Get all todos for current user"""
-    todos = db.query(models.Todo).filter(
-        models.Todo.user_id == current_user.id
-    ).offset(skip).limit(limit).all()
-    return todos
-
-@router.get("/{todo_id}", response_model=schemas.Todo)
-def get_todo(
-    todo_id: int,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Get specific todo by ID"""
-    todo = db.query(models.Todo).filter(
+async def get_user_todo(db: AsyncSession, todo_id: int, user_id: int):
+    """Get todo owned by user or raise 404"""
+    result = await db.execute(select(models.Todo).where(
         models.Todo.id == todo_id,
-        models.Todo.user_id == current_user.id
-    ).first()
-    
+        models.Todo.user_id == user_id
+    ))
+    todo = result.scalars().first()
+
     if not todo:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -40,81 +33,303 @@ def get_todo(
         )
     return todo
 
+def todo_filters(
+    completed: Optional[bool] = None,
+    category: Optional[str] = None,
+    priority: Optional[str] = None,
+    due_after: Optional[datetime] = None,
+    due_before: Optional[datetime] = None
+):
+    """Filter query parameters as SQL conditions"""
+    conditions = []
+    if completed is not None:
+        conditions.append(models.Todo.completed == completed)
+    if category is not None:
+        conditions.append(models.Todo.category == category)
+    if priority is not None:
+        conditions.append(models.Todo.priority == priority)
+    if due_after is not None:
+        conditions.append(models.Todo.due_date >= due_after)
+    if due_before is not None:
+        conditions.append(models.Todo.due_date < due_before)
+    return conditions
+
+def todo_order_by(sort: str, order: str):
+    """ORDER BY for `sort`; todos without due date always come last"""
+    direction = desc if order == "desc" else asc
+    if sort == "due_date":
+        return [models.Todo.due_date.is_(None), direction(models.Todo.due_date), direction(models.Todo.id)]
+    if sort == "priority":
+        return [direction(models.Todo.priority_rank), direction(models.Todo.id)]
+    if sort == "created_at":
+        return [direction(models.Todo.created_at), direction(models.Todo.id)]
+    return [direction(models.Todo.id)]
+
+@router.get("/", response_model=List[schemas.Todo])
+async def get_todos(
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    sort: Literal["id", "created_at", "due_date", "priority"] = "id",
+    order: Literal["asc", "desc"] = "asc",
+    filters: list = Depends(todo_filters),
+    current_user: TokenUser = Depends(get_token_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get todos for current user, filtered and sorted in SQL"""
+    cached = await not_modified(request, response, db, current_user)
+    if cached:
+        return cached
+    columns = schema_columns(schemas.Todo, models.Todo) if FAST_SERIALIZATION else [models.Todo]
+    result = await db.execute(select(*columns).where(
+        models.Todo.user_id == current_user.id,
+        *filters
+    ).order_by(*todo_order_by(sort, order)).offset(skip).limit(limit))
+    if FAST_SERIALIZATION:
+        return FastJSONResponse(rows_as_dicts(result), headers=response.headers)
+    return result.scalars().all()
+
+@router.get("/page", response_model=schemas.TodoPage)
+async def get_todos_page(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    filters: list = Depends(todo_filters),
+    current_user: TokenUser = Depends(get_token_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get todos newest first using keyset (cursor) pagination"""
+    cached = await not_modified(request, response, db, current_user)
+    if cached:
+        return cached
+    columns = schema_columns(schemas.Todo, models.Todo) if FAST_SERIALIZATION else [models.Todo]
+    stmt = select(*columns).where(models.Todo.user_id == current_user.id, *filters)
+    todos, next_cursor = await paginate_keyset(
+        db, stmt, models.Todo.created_at, models.Todo.id, cursor, limit, as_dicts=FAST_SERIALIZATION
+    )
+    if FAST_SERIALIZATION:
+        return FastJSONResponse({"items": todos, "next_cursor": next_cursor}, headers=response.headers)
+    return {"items": todos, "next_cursor": next_cursor}
+
+@router.get("/stats", response_model=schemas.TodoStats)
+async def get_todos_stats(
+    current_user: TokenUser = Depends(get_token_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Dashboard counts by status, category, priority and due date"""
+    return await get_todo_stats(db, current_user.id)
+
+@router.post("/batch", response_model=schemas.TodoBatchResponse)
+async def batch_todos(
+    batch: schemas.TodoBatchRequest,
+    current_user: TokenUser = Depends(get_token_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Apply create/update/delete/toggle operations in one transaction"""
+    operations = batch.operations
+    errors = {}
+    referenced = {}  # todo id -> index operasi
+
+    for index, op in enumerate(operations):
+        if op.op == "create":
+            if op.todo is None:
+                errors[index] = "Field 'todo' wajib untuk create"
+        elif op.id is None:
+            errors[index] = f"Field 'id' wajib untuk {op.op}"
+        elif op.op == "update" and op.changes is None:
+            errors[index] = "Field 'changes' wajib untuk update"
+        elif op.id in referenced:
+            errors[index] = "Todo muncul lebih dari sekali dalam batch"
+        else:
+            referenced[op.id] = index
+
+    # Cek kepemilikan semua id dengan satu query
+    if referenced:
+        result = await db.execute(select(models.Todo.id).where(
+            models.Todo.user_id == current_user.id,
+            models.Todo.id.in_(referenced)
+        ))
+        owned = set(result.scalars().all())
+        for todo_id, index in referenced.items():
+            if todo_id not in owned:
+                errors[index] = "Todo not found"
+
+    creates, delete_ids, toggle_ids = [], [], []
+    update_groups = {}  # perubahan yang sama -> satu UPDATE
+    for index, op in enumerate(operations):
+        if index in errors:
+            continue
+        if op.op == "create":
+            values = op.todo.dict()
+            creates.append((index, {
+                **values,
+                "user_id": current_user.id,
+                "priority_rank": models.priority_rank(values["priority"])
+            }))
+        elif op.op == "delete":
+            delete_ids.append(op.id)
+        elif op.op == "toggle":
+            toggle_ids.append(op.id)
+        else:
+            changes = op.changes.dict(exclude_unset=True)
+            if "priority" in changes:
+                changes["priority_rank"] = models.priority_rank(changes["priority"])
+            update_groups.setdefault(tuple(sorted(changes.items())), []).append(op.id)
+
+    revision = None
+    if len(errors) < len(operations):
+        revision = await bump_revision(db, current_user.id)
+
+    # Insert dulu agar id yang dihapus di batch ini tidak dipakai ulang
+    created_ids = {}
+    if creates:
+        result = await db.scalars(
+            insert(models.Todo).returning(models.Todo.id, sort_by_parameter_order=True),
+            [{**values, "revision": revision} for _, values in creates]
+        )
+        created_ids = dict(zip((index for index, _ in creates), result.all()))
+
+    owned_filter = (models.Todo.user_id == current_user.id,)
+    no_sync = {"synchronize_session": False}
+    if delete_ids:
+        await db.execute(
+            delete(models.Todo).where(*owned_filter, models.Todo.id.in_(delete_ids)),
+            execution_options=no_sync
+        )
+        await record_deletions(db, current_user.id, "todo", delete_ids, revision)
+    if toggle_ids:
+        await db.execute(
+            update(models.Todo)
+            .where(*owned_filter, models.Todo.id.in_(toggle_ids))
+            .values(completed=~models.Todo.completed, revision=revision),
+            execution_options=no_sync
+        )
+    for changes, ids in update_groups.items():
+        if changes:
+            await db.execute(
+                update(models.Todo)
+                .where(*owned_filter, models.Todo.id.in_(ids))
+                .values(**dict(changes), revision=revision),
+                execution_options=no_sync
+            )
+
+    await db.commit()
+    invalidate_todo_stats(current_user.id)
+
+    # Ambil hasil akhir semua todo yang berubah dengan satu query
+    changed_ids = list(created_ids.values()) + toggle_ids + [i for ids in update_groups.values() for i in ids]
+    if revision is not None:
+        await publish_change(current_user.id, "todo", "batch", changed_ids + delete_ids, revision)
+    todos = {}
+    if changed_ids:
+        result = await db.execute(select(models.Todo).where(models.Todo.id.in_(changed_ids)))
+        todos = {todo.id: todo for todo in result.scalars().all()}
+
+    results = []
+    for index, op in enumerate(operations):
+        todo_id = created_ids.get(index, op.id)
+        results.append({
+            "index": index,
+            "op": op.op,
+            "id": todo_id,
+            "ok": index not in errors,
+            "detail": errors.get(index),
+            "todo": todos.get(todo_id) if index not in errors and op.op != "delete" else None,
+        })
+    return {"results": results}
+
+@router.get("/{todo_id}", response_model=schemas.Todo)
+async def get_todo(
+    todo_id: int,
+    request: Request,
+    response: Response,
+    current_user: TokenUser = Depends(get_token_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get specific todo by ID"""
+    cached = await not_modified(request, response, db, current_user)
+    if cached:
+        return cached
+    return await get_user_todo(db, todo_id, current_user.id)
+
 @router.post("/", response_model=schemas.Todo, status_code=status.HTTP_201_CREATED)
-def create_todo(
+async def create_todo(
     todo: schemas.TodoCreate,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: TokenUser = Depends(get_token_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Create new todo"""
     db_todo = models.Todo(
         **todo.dict(),
-        user_id=current_user.id
+        user_id=current_user.id,
+        revision=await bump_revision(db, current_user.id)
     )
     db.add(db_todo)
-    db.commit()
-    db.refresh(db_todo)
+    await db.commit()
+    invalidate_todo_stats(current_user.id)
+    await db.refresh(db_todo)
+    await publish_change(current_user.id, "todo", "create", [db_todo.id], db_todo.revision)
     return db_todo
 
 @router.put("/{todo_id}", response_model=schemas.Todo)
-def update_todo(
+async def update_todo(
     todo_id: int,
     todo_update: schemas.TodoUpdate,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: TokenUser = Depends(get_token_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Update todo"""
-    todo = db.query(models.Todo).filter(
-        models.Todo.id == todo_id,
-        models.Todo.user_id == current_user.id
-    ).first()
-    
-    if not todo:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Todo not found"
-        )
-    
+    todo = await get_user_todo(db, todo_id, current_user.id)
+
     # Update only provided fields
     update_data = todo_update.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(todo, key, value)
-    
-    db.commit()
-    db.refresh(todo)
+
+    todo.revision = await bump_revision(db, current_user.id)
+    await db.commit()
+    invalidate_todo_stats(current_user.id)
+    await db.refresh(todo)
+    await publish_change(current_user.id, "todo", "update", [todo.id], todo.revision)
     return todo
 
 @router.delete("/{todo_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_todo(
+async def delete_todo(
     todo_id: int,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: TokenUser = Depends(get_token_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete todo"""
-    todo = db.query(models.Todo).filter(
-        models.Todo.id == todo_id,
-        models.Todo.user_id == current_user.id
-    ).first()
-    
-    if not todo:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Todo not found"
-        )
-    
-    db.delete(todo)
-    db.commit()
+    todo = await get_user_todo(db, todo_id, current_user.id)
+
+    await db.delete(todo)
+    revision = await bump_revision(db, current_user.id)
+    await record_deletions(db, current_user.id, "todo", [todo_id], revision)
+    await db.commit()
+    invalidate_todo_stats(current_user.id)
+    await publish_change(current_user.id, "todo", "delete", [todo_id], revision)
     return None
 
 @router.delete("/completed/clear", status_code=status.HTTP_204_NO_CONTENT)
-def clear_completed_todos(
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def clear_completed_todos(
+    current_user: TokenUser = Depends(get_token_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete all completed todos"""
-    db.query(models.Todo).filter(
-        models.Todo.user_id == current_user.id,
-        models.Todo.completed == True
-    ).delete()
-    db.commit()
+    result = await db.execute(
+        delete(models.Todo).where(
+            models.Todo.user_id == current_user.id,
+            models.Todo.completed == True
+        ).returning(models.Todo.id)
+    )
+    deleted_ids = result.scalars().all()
+    if deleted_ids:
+        revision = await bump_revision(db, current_user.id)
+        await record_deletions(db, current_user.id, "todo", deleted_ids, revision)
+    await db.commit()
+    invalidate_todo_stats(current_user.id)
+    if deleted_ids:
+        await publish_change(current_user.id, "todo", "delete", deleted_ids, revision)
     return None
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import List, Literal, Optional
 
 # User Schemas
 class UserBase(BaseModel):
@@ -26,6 +26,7 @@ class UserResponse(BaseModel):
     user: User
     access_token: str
     token_type: str = "bearer"
+    refresh_token: Optional[str] = None
 
 class UserProfileUpdate(BaseModel):
     name: Optional[str] = None
@@ -61,14 +62,59 @@ class Todo(TodoBase):
     category: Optional[str] = None
     priority: str = "medium"
     description: Optional[str] = None
+    revision: int = 0
 
     class Config:
         from_attributes = True
 
+class TodoPage(BaseModel):
+    items: List[Todo]
+    next_cursor: Optional[str] = None
+
+class TodoStatsGroup(BaseModel):
+    key: Optional[str] = None
+    total: int
+    completed: int
+
+class TodoStats(BaseModel):
+    total: int
+    completed: int
+    active: int
+    overdue: int
+    due_today: int
+    due_this_week: int
+    no_due_date: int
+    by_category: List[TodoStatsGroup]
+    by_priority: List[TodoStatsGroup]
+    generated_at: datetime
+
+class TodoBatchOperation(BaseModel):
+    op: Literal["create", "update", "delete", "toggle"]
+    id: Optional[int] = None  # wajib untuk update/delete/toggle
+    todo: Optional[TodoCreate] = None  # untuk create
+    changes: Optional[TodoUpdate] = None  # untuk update
+
+class TodoBatchRequest(BaseModel):
+    operations: List[TodoBatchOperation] = Field(..., min_length=1, max_length=1000)
+
+class TodoBatchResult(BaseModel):
+    index: int
+    op: str
+    id: Optional[int] = None
+    ok: bool
+    detail: Optional[str] = None
+    todo: Optional[Todo] = None
+
+class TodoBatchResponse(BaseModel):
+    results: List[TodoBatchResult]
+
 # Token Schema
 class Token(BaseModel):
     access_token: str
     token_type: str
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
 class TokenData(BaseModel):
     username: Optional[str] = None
@@ -1,15 +1,20 @@
 """
 Script untuk membuat demo users
 Jalankan: python seed_data.py
+Bulk (untuk benchmark): python seed_data.py --users 100 --todos 1000 --notes 200
 """
 
+import argparse
+from datetime import datetime, timedelta
+from sqlalchemy import insert, select
 from sqlalchemy.orm import Session
 from database import SessionLocal, engine
-from models import Base, User
+from models import User, Todo, Note, note_preview, priority_rank
 from auth import get_password_hash
+from migrations import upgrade
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Buat/upgrade skema database
+upgrade(engine)
 
 def seed_users():
     db = SessionLocal()
@@ -52,6 +57,89 @@ def seed_users():
     print("1. admin / admin123")
     print("2. user / user123")
 
+def chunked(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def seed_bulk(users: int, todos_per_user: int, notes_per_user: int,
+              password: str = "bench123", prefix: str = "bench", batch_size: int = 5000):
+    """
+    Bulk-insert `users` users with todos and notes using executemany.
+    Password di-hash sekali dan dipakai semua user. Returns list of user ids.
+    """
+    hashed_password = get_password_hash(password)
+    now = datetime.utcnow()
+    priorities = ("high", "medium", "low")
+    categories = ("Sekolah", "Kerja", "Pribadi", None)
+
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {
+                "username": f"{prefix}{i}",
+                "email": f"{prefix}{i}@example.com",
+                "name": f"Bench User {i}",
+                "hashed_password": hashed_password,
+                "created_at": now,
+            }
+            for i in range(users)
+        ])
+        user_ids = conn.execute(
+            select(User.id).where(User.username.in_([f"{prefix}{i}" for i in range(users)])).order_by(User.id)
+        ).scalars().all()
+
+        todo_rows = (
+            {
+                "user_id": user_id,
+                "text": f"Todo {n} milik {user_id}",
+                "description": f"Deskripsi todo nomor {n}" if n % 3 == 0 else None,
+                "completed": n % 4 == 0,
+                "priority": priorities[n % 3],
+                "priority_rank": priority_rank(priorities[n % 3]),
+                "category": categories[n % 4],
+                "created_at": now - timedelta(minutes=n),
+                "due_date": now + timedelta(days=n % 30) if n % 2 else None,
+            }
+            for user_id in user_ids for n in range(todos_per_user)
+        )
+        for chunk in chunked(todo_rows, batch_size):
+            conn.execute(insert(Todo), chunk)
+
+        def note_row(user_id, n):
+            content = f"Isi catatan nomor {n} untuk user {user_id}. " * 5
+            return {
+                "user_id": user_id,
+                "title": f"Catatan {n}",
+                "content": content,
+                "preview": note_preview(content),
+                "category": categories[n % 4],
+                "color": "yellow",
+                "created_at": now - timedelta(minutes=n),
+                "updated_at": now - timedelta(minutes=n),
+            }
+
+        note_rows = (note_row(user_id, n) for user_id in user_ids for n in range(notes_per_user))
+        for chunk in chunked(note_rows, batch_size):
+            conn.execute(insert(Note), chunk)
+
+    return user_ids
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed database")
+    parser.add_argument("--users", type=int, help="jumlah user untuk bulk seeding")
+    parser.add_argument("--todos", type=int, default=100, help="todos per user")
+    parser.add_argument("--notes", type=int, default=20, help="notes per user")
+    args = parser.parse_args()
+
     print("🌱 Seeding database...")
-    seed_users()
+    if args.users:
+        ids = seed_bulk(args.users, args.todos, args.notes)
+        print(f"✅ {len(ids)} user, {len(ids) * args.todos} todos, {len(ids) * args.notes} notes dibuat")
+        print("   Login: bench0@example.com / bench123")
+    else:
+        seed_users()
@@ -0,0 +1,42 @@
+"""
+Fast path serialisasi untuk list endpoint: select kolom sebagai tuple, jadikan dict,
+lalu encode dengan orjson (jika terinstall) tanpa ORM object dan validasi pydantic
+"""
+import json
+from datetime import date, datetime
+from typing import Any, List
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson opsional
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded with orjson when available"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def schema_columns(schema, model) -> list:
+    """Model columns for the fields of a response schema, in schema order"""
+    return [getattr(model, name) for name in schema.model_fields]
+
+
+def rows_as_dicts(result) -> List[dict]:
+    """Rows of a column select() as plain dicts"""
+    return [dict(row) for row in result.mappings()]
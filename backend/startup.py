@@ -0,0 +1,92 @@
+"""
+Readiness dan warm-up setelah start
+
+/health (liveness) hijau begitu server menerima koneksi. /health/ready baru
+hijau setelah skema up to date dan warm-up selesai: daftar refresh token yang
+dicabut dimuat, connection pool async terisi, python-jose ter-import dan
+worker hash pool (passlib) sudah berjalan.
+Warm-up berjalan di background setelah lifespan, jadi tidak menunda start;
+health check deploy / load balancer sebaiknya memakai /health/ready.
+"""
+import asyncio
+import importlib
+import logging
+import time
+from contextlib import AsyncExitStack
+from typing import Dict, Optional
+from sqlalchemy import text
+from sqlalchemy.pool import QueuePool
+from config import MIGRATION_POLL_SECONDS
+from database import async_engine, engine
+from hashing import hash_pool
+from migrations import pending_migrations
+from revocation import load_revocations
+
+logger = logging.getLogger("todo.startup")
+
+
+class Readiness:
+    """Warm-up steps finished so far (with durations) and the ready flag"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.steps: Dict[str, float] = {}
+        self.ready = False
+        self.error: Optional[str] = None
+
+    async def run(self, name: str, awaitable):
+        start = time.perf_counter()
+        result = await awaitable
+        self.steps[name] = round(time.perf_counter() - start, 4)
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "steps": dict(self.steps),
+            "seconds_since_start": round(time.perf_counter() - self.started, 3),
+            "error": self.error,
+        }
+
+
+readiness = Readiness()
+
+
+async def wait_for_migrations(poll_seconds: float = MIGRATION_POLL_SECONDS):
+    """Return once no migration is pending (e.g. applied by the pre-deploy step)"""
+    warned = False
+    while True:
+        pending = await asyncio.to_thread(pending_migrations, engine)
+        if not pending:
+            return
+        if not warned:
+            logger.warning("Menunggu migrasi %s (jalankan python migrations.py)", ", ".join(pending))
+            warned = True
+        await asyncio.sleep(poll_seconds)
+
+
+async def warm_pool(bind=async_engine) -> int:
+    """Open and check every pooled connection once; returns how many"""
+    pool = bind.sync_engine.pool
+    size = pool.size() if isinstance(pool, QueuePool) else 1
+    async with AsyncExitStack() as stack:
+        for _ in range(size):
+            conn = await stack.enter_async_context(bind.connect())
+            await conn.execute(text("SELECT 1"))
+    return size
+
+
+async def warm_up():
+    """Background task started by the lifespan; flips `readiness.ready`"""
+    try:
+        await readiness.run("migrations", wait_for_migrations())
+        await readiness.run("revocations", load_revocations(compact=True))
+        await readiness.run("db_pool", warm_pool())
+        await readiness.run("jwt", asyncio.to_thread(importlib.import_module, "jose.jwt"))
+        await readiness.run("hash_pool", hash_pool.warm_up())
+    except Exception as exc:
+        logger.exception("Warm-up gagal")
+        readiness.error = repr(exc)
+        return
+    readiness.ready = True
+    logger.info("Siap menerima traffic (%.2f s sejak start)", time.perf_counter() - readiness.started)
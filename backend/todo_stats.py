@@ -0,0 +1,96 @@
+"""
+Statistik todo per user (dashboard) dari satu query GROUP BY, dengan cache per user
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+import models
+from cache import TTLCache
+from config import TODO_STATS_CACHE_MAX_SIZE, TODO_STATS_CACHE_TTL_SECONDS
+from revision import get_revision
+
+# user_id -> (revision, stats); entry dengan revision lama dianggap miss
+todo_stats_cache = TTLCache(
+    maxsize=TODO_STATS_CACHE_MAX_SIZE, ttl=TODO_STATS_CACHE_TTL_SECONDS, name="todo_stats_cache"
+)
+
+
+def due_bucket(now: datetime):
+    """CASE expression putting due_date into none/overdue/today/week/later"""
+    today_end = datetime(now.year, now.month, now.day) + timedelta(days=1)
+    return case(
+        (models.Todo.due_date.is_(None), "none"),
+        (models.Todo.due_date < now, "overdue"),
+        (models.Todo.due_date < today_end, "today"),
+        (models.Todo.due_date < now + timedelta(days=7), "week"),
+        else_="later",
+    )
+
+
+def _group(counts: dict, key, completed: bool, count: int):
+    entry = counts.setdefault(key, {"total": 0, "completed": 0})
+    entry["total"] += count
+    if completed:
+        entry["completed"] += count
+
+
+async def compute_todo_stats(db: AsyncSession, user_id: int) -> dict:
+    """Aggregate counts by category, priority, completed and due date bucket"""
+    now = datetime.utcnow()
+    bucket = due_bucket(now).label("bucket")
+    result = await db.execute(
+        select(
+            models.Todo.category,
+            models.Todo.priority,
+            models.Todo.completed,
+            bucket,
+            func.count().label("count"),
+        )
+        .where(models.Todo.user_id == user_id)
+        .group_by(models.Todo.category, models.Todo.priority, models.Todo.completed, bucket)
+    )
+
+    stats = {
+        "total": 0, "completed": 0, "active": 0,
+        "overdue": 0, "due_today": 0, "due_this_week": 0, "no_due_date": 0,
+    }
+    by_category, by_priority = {}, {}
+    for category, priority, completed, bucket_name, count in result.all():
+        completed = bool(completed)
+        stats["total"] += count
+        stats["completed" if completed else "active"] += count
+        if bucket_name == "none":
+            stats["no_due_date"] += count
+        elif not completed and bucket_name == "overdue":
+            stats["overdue"] += count
+        elif not completed and bucket_name == "today":
+            stats["due_today"] += count
+        elif not completed and bucket_name == "week":
+            stats["due_this_week"] += count
+        _group(by_category, category, completed, count)
+        _group(by_priority, priority, completed, count)
+
+    stats["by_category"] = [
+        {"key": key, **counts} for key, counts in sorted(by_category.items(), key=lambda item: (item[0] is None, item[0] or ""))
+    ]
+    stats["by_priority"] = [
+        {"key": key, **counts} for key, counts in sorted(by_priority.items(), key=lambda item: (item[0] is None, item[0] or ""))
+    ]
+    stats["generated_at"] = now
+    return stats
+
+
+async def get_todo_stats(db: AsyncSession, user_id: int) -> dict:
+    """Stats from todo_stats_cache, recomputed when the user's revision moved"""
+    revision = await get_revision(db, user_id)
+    cached = todo_stats_cache.get(user_id)
+    if cached is not None and cached[0] == revision:
+        return cached[1]
+    stats = await compute_todo_stats(db, user_id)
+    todo_stats_cache.set(user_id, (revision, stats))
+    return stats
+
+
+def invalidate_todo_stats(user_id: int):
+    """Drop cached stats after the user's todos changed"""
+    todo_stats_cache.invalidate(user_id)
@@ -0,0 +1,113 @@
+"""
+JWT access token: keyring berbasis `kid` (rotasi secret tanpa memutus sesi)
+dan cache token yang sudah diverifikasi
+
+python-jose (beserta backend cryptography) baru di-import saat token pertama
+dibuat/diverifikasi agar start aplikasi lebih cepat.
+"""
+import secrets
+import time
+from datetime import datetime, timedelta
+from typing import Dict, NamedTuple, Optional
+from cache import TTLCache
+from config import (
+    JWT_ACTIVE_KID,
+    JWT_KEYS,
+    SECRET_KEY,
+    TOKEN_CACHE_MAX_SIZE,
+    TOKEN_CACHE_TTL_SECONDS,
+)
+
+ALGORITHM = "HS256"
+# Token lama tanpa header kid ditandatangani SECRET_KEY
+LEGACY_KID = "default"
+REFRESH_TYPE = "refresh"
+
+
+def parse_keyring(spec: str, fallback_secret: str) -> Dict[str, str]:
+    """Parse "kid:secret,kid:secret"; empty spec means {LEGACY_KID: fallback_secret}"""
+    keys = {}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        kid, _, secret = item.partition(":")
+        if not kid or not secret:
+            raise ValueError(f"JWT_KEYS tidak valid: {item!r} (format kid:secret)")
+        keys[kid] = secret
+    return keys or {LEGACY_KID: fallback_secret}
+
+
+KEYS = parse_keyring(JWT_KEYS, SECRET_KEY)
+ACTIVE_KID = JWT_ACTIVE_KID or next(iter(KEYS))
+if ACTIVE_KID not in KEYS:
+    raise ValueError(f"JWT_ACTIVE_KID {ACTIVE_KID!r} tidak ada di JWT_KEYS")
+
+
+class TokenUser(NamedTuple):
+    """
+    Identity carried by a verified access token. Enough for routes that only
+    need the user id; `name` is as of login time.
+    """
+    id: Optional[int]
+    username: str
+    name: Optional[str]
+
+
+token_cache = TTLCache(maxsize=TOKEN_CACHE_MAX_SIZE, ttl=TOKEN_CACHE_TTL_SECONDS, name="token_cache")
+
+
+def encode_token(data: dict, expires_delta: timedelta) -> str:
+    """Sign claims with the active key, adding `exp` and the `kid` header"""
+    from jose import jwt
+    claims = {**data, "exp": datetime.utcnow() + expires_delta}
+    return jwt.encode(claims, KEYS[ACTIVE_KID], algorithm=ALGORITHM, headers={"kid": ACTIVE_KID})
+
+
+def encode_refresh_token(data: dict, expires_delta: timedelta) -> str:
+    """Sign a refresh token; `jti` and `iat` make it individually revocable"""
+    return encode_token({**data, "typ": REFRESH_TYPE, "jti": secrets.token_hex(16), "iat": time.time()}, expires_delta)
+
+
+def _decode(token: str) -> Optional[dict]:
+    """Verify signature (key chosen by `kid`) and exp; None if invalid"""
+    from jose import JWTError, jwt
+    try:
+        secret = KEYS.get(jwt.get_unverified_header(token).get("kid", LEGACY_KID))
+        if secret is None:
+            return None
+        return jwt.decode(token, secret, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+
+
+def decode_refresh_token(token: str) -> Optional[dict]:
+    """Claims of a valid refresh token (revocation is checked by the caller)"""
+    payload = _decode(token)
+    if payload is None or payload.get("typ") != REFRESH_TYPE:
+        return None
+    if not isinstance(payload.get("jti"), str) or not isinstance(payload.get("uid"), int):
+        return None
+    return payload
+
+
+def verify_token(token: str) -> Optional[TokenUser]:
+    """Return the access token's identity, or None if it is invalid or expired"""
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached
+    payload = _decode(token)
+    # Refresh token tidak boleh dipakai sebagai access token
+    if payload is None or payload.get("typ") == REFRESH_TYPE:
+        return None
+    username = payload.get("sub")
+    if not isinstance(username, str):
+        return None
+    user = TokenUser(payload.get("uid"), username, payload.get("name"))
+    # Entry cache tidak boleh hidup lebih lama dari token
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        ttl = min(exp - time.time(), token_cache.ttl)
+        if ttl > 0:
+            token_cache.set(token, user, ttl=ttl)
+    return user
@@ -174,7 +174,7 @@ export default function Notes() {
               {note.title}
             </h3>
             <p className="text-gray-600 dark:text-gray-400 mb-4 line-clamp-3">
-              {note.content}
+              {note.preview ?? note.content}
             </p>
 
             {/* Note Footer */}
@@ -180,7 +180,9 @@ export async function apiClearCompleted(token: string): Promise<void> {
 export interface ApiNote {
   id: number;
   title: string;
-  content: string | null;
+  // GET /api/notes/ hanya mengirim preview; content lengkap dari apiGetNote
+  content?: string | null;
+  preview?: string | null;
   category: string | null;
   color: string;
   user_id: number;